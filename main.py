@@ -3,15 +3,31 @@
 Editor JSON Mapping — Dragflow (v0.4)
 Requisiti:  pip install tksheet
 """
+import argparse
+import copy
+import csv
+import gc
 import json
+from bisect import bisect_left, bisect_right
 import os
+import re
+import sys
+import time
 import tkinter as tk
+import zlib
 from tkinter import ttk, filedialog, messagebox
-from typing import Any, Dict, List, Tuple, Optional
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Tuple, Optional
 
 from tksheet import Sheet
 
 APP_TITLE = "Editor JSON Mapping — Dragflow (v0.4)"
+WATCH_INTERVAL_MS = 1000   # polling del file aperto in modalità "Osserva"
+TREE_MAX_CHILDREN = 2000   # figli mostrati per nodo dell'albero percorsi
+DOC_ROWS_BUDGET = 1_500_000  # righe residenti in memoria fra tutte le schede (LRU oltre soglia)
+JOURNAL_SUFFIX = ".journal"  # modifiche non salvate, accanto al file di mapping
+JOURNAL_FLUSH_MS = 2000
+JOURNAL_COMPACT_BYTES = 4 * 1024 * 1024
+COLUMNS_FILE = "columns.json"  # colonne aggiuntive (vedi load_column_schema), accanto allo script
 
 # ----------------- Utility (non usate ovunque, ma comode se servono) -----------------
 def safe_get(d: Dict[str, Any], path: List[str]):
@@ -57,22 +73,933 @@ def safe_set(d: Dict[str, Any], path: List[str], value: Any):
             cur = cur[p]
     return False
 
-# ----------------- Tabella -----------------
-HEADERS = [
-    "type",                # top-level type
-    "label",
-    "unit",
-    "trigger type",        # triggers[0].type
-    "level",               # triggers[0].level
-    "mode",                # triggers[0].mode
-    "min interval ms",     # triggers[0].minIntervalMs
-    "skip first n changes",# triggers[0].skipFirstNChanges
-    "change mask",         # triggers[0].changeMask
-    "deadband",            # triggers[0].deadband OR deadbandPercent
-    "deadband type"        # ABS | PERC
+
+def file_signature(path: str) -> Optional[Tuple[int, int]]:
+    """(mtime_ns, size) del file, None se non leggibile."""
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return (st.st_mtime_ns, st.st_size)
+
+
+def mapping_root(data: Any) -> Dict[str, Any]:
+    """Nodo che contiene 'properties' (data['json'] se presente, altrimenti data)."""
+    if not isinstance(data, dict):
+        return {}
+    root = data.get("json")
+    return root if isinstance(root, dict) and root else data
+
+# ----------------- Percorsi campo compilati -----------------
+_FIELD_TOKEN = re.compile(r"(?:^|\.)([^.\[\]]+)|\[(\d+)\]")
+
+
+def parse_field_path(text: str) -> List[Any]:
+    """'sendPolicy.triggers[1].minIntervalMs' -> ['sendPolicy', 'triggers', 1, 'minIntervalMs']."""
+    keys: List[Any] = []
+    pos = 0
+    while pos < len(text):
+        m = _FIELD_TOKEN.match(text, pos)
+        if m is None:
+            raise ValueError(f"percorso non valido: '{text}'")
+        keys.append(m.group(1) if m.group(1) is not None else int(m.group(2)))
+        pos = m.end()
+    if not keys or type(keys[0]) is not str or text.startswith("."):
+        raise ValueError(f"percorso non valido: '{text}'")
+    return keys
+
+
+def _field_expr(keys: List[Any]) -> str:
+    # un'unica espressione o[k1][k2]... : nessun parsing né ciclo a ogni chiamata
+    return "o" + "".join(f"[{k!r}]" for k in keys)
+
+
+def _compile_getter(text: str, keys: List[Any]) -> Callable[[Any], Any]:
+    src = (f"def get(o):\n"
+           f"    try:\n"
+           f"        return {_field_expr(keys)}\n"
+           f"    except (KeyError, IndexError, TypeError):\n"
+           f"        return None\n")
+    ns: Dict[str, Any] = {}
+    exec(compile(src, f"<campo {text}>", "exec"), ns)
+    return ns["get"]
+
+
+class FieldPath:
+    """Percorso di un campo dentro una property, analizzato e compilato una volta sola."""
+
+    __slots__ = ("text", "keys", "get", "_steps", "_parent")
+
+    def __init__(self, text: str):
+        self.text = text
+        self.keys = parse_field_path(text)
+        self.get = _compile_getter(text, self.keys)   # None se il campo manca
+        # per ogni passo intermedio: chiave e tipo di contenitore che deve trovarci
+        self._steps = [(k, list if type(nxt) is int else dict) for k, nxt in zip(self.keys, self.keys[1:])]
+        self._parent = _compile_getter(text, self.keys[:-1]) if len(self.keys) > 1 else None
+
+    def set(self, obj: Dict[str, Any], value: Any):
+        """Scrive il campo creando i contenitori mancanti (le liste corte vengono allungate)."""
+        cur: Any = obj
+        for key, kind in self._steps:
+            if type(key) is int:
+                while len(cur) <= key:
+                    cur.append(kind())
+                child = cur[key]
+            else:
+                child = cur.get(key)
+            if not isinstance(child, kind):
+                child = kind()
+                cur[key] = child
+            cur = child
+        last = self.keys[-1]
+        if type(last) is int:
+            while len(cur) <= last:
+                cur.append(None)
+        cur[last] = value
+
+    def delete(self, obj: Dict[str, Any]):
+        """Rimuove il campo se c'è (gli elementi di lista non vengono tolti, per non spostare gli altri)."""
+        parent = self._parent(obj) if self._parent is not None else obj
+        if isinstance(parent, dict):
+            parent.pop(self.keys[-1], None)
+
+    def setdefault(self, obj: Dict[str, Any]) -> Dict[str, Any]:
+        """Oggetto al percorso, creato vuoto se manca."""
+        cur = self.get(obj)
+        if not isinstance(cur, dict):
+            cur = {}
+            self.set(obj, cur)
+        return cur
+
+# ----------------- Tabella (schema colonne) -----------------
+COLUMN_KINDS = ("str", "int", "float", "bool")
+NUMERIC_KINDS = ("int", "float")
+_BOOL_TEXT = {"true": True, "1": True, "sì": True, "si": True, "false": False, "0": False, "no": False}
+
+
+class Column:
+    """Colonna della tabella: intestazione, campo della property e regole di scrittura.
+
+    - `keep_if_empty`: cella vuota = campo lasciato com'è (altrimenti viene rimosso);
+    - `widget`/`exact`: filtro a tendina o testo, confronto esatto o per sottostringa/numero;
+    - `get`: lettura personalizzata al posto del percorso (colonne calcolate, es. deadband).
+    """
+
+    __slots__ = ("header", "field", "kind", "minimum", "maximum", "keep_if_empty", "widget", "exact", "get")
+
+    def __init__(self, header: str, path: Optional[str] = None, kind: str = "str",
+                 minimum: Optional[float] = None, maximum: Optional[float] = None,
+                 keep_if_empty: bool = False, widget: str = "text", exact: bool = False,
+                 get: Optional[Callable[[Any], Any]] = None):
+        self.header = header
+        self.field = FieldPath(path) if path else None
+        self.kind = kind
+        self.minimum = minimum
+        self.maximum = maximum
+        self.keep_if_empty = keep_if_empty
+        self.widget = widget
+        self.exact = exact
+        self.get = get if get is not None else self.field.get
+
+    def commit(self, obj: Dict[str, Any], value: Any, path: str, errors: List[str]):
+        """Scrive il valore della cella nella property; se non valido lo segnala in `errors`."""
+        if isinstance(value, (dict, list)):
+            return   # cella con l'oggetto/lista originale: non è un valore da scrivere
+        current = self.field.get(obj)
+        if isinstance(current, (dict, list)):
+            errors.append(f"{path}: '{self.header}' è un oggetto/lista, non modificabile dalla tabella")
+            return
+        if value == ("" if current is None else current):
+            return   # cella non toccata: il campo resta com'è (tipo compreso, anche null)
+        text = str(value).strip()
+        if text == "":
+            if not self.keep_if_empty:
+                self.field.delete(obj)
+            return
+        if self.kind == "str":
+            self.field.set(obj, text)
+            return
+        if self.kind == "bool":
+            flag = _BOOL_TEXT.get(text.lower())
+            if flag is None:
+                errors.append(f"{path}: '{self.header}' non valido (true/false)")
+            else:
+                self.field.set(obj, flag)
+            return
+        try:
+            num = int(value) if self.kind == "int" else float(value)
+            if self.minimum is not None and num < self.minimum: raise ValueError
+            if self.maximum is not None and num > self.maximum: raise ValueError
+        except Exception:
+            errors.append(f"{path}: '{self.header}' non valido{self._range_hint()}")
+            return
+        self.field.set(obj, num)
+
+    def _range_hint(self) -> str:
+        if self.minimum is not None and self.maximum is not None:
+            return f" ({self.minimum}..{self.maximum})"
+        if self.minimum is not None:
+            return f" (>={self.minimum})"
+        if self.maximum is not None:
+            return f" (<={self.maximum})"
+        return ""
+
+
+TRIGGER0 = FieldPath("sendPolicy.triggers[0]")
+_DEADBAND = FieldPath("sendPolicy.triggers[0].deadband")
+_DEADBAND_PERC = FieldPath("sendPolicy.triggers[0].deadbandPercent")
+
+
+def _get_deadband(obj: Dict[str, Any]) -> Any:
+    v = _DEADBAND_PERC.get(obj)
+    return _DEADBAND.get(obj) if v is None else v
+
+
+def _get_deadband_type(obj: Dict[str, Any]) -> str:
+    if _DEADBAND_PERC.get(obj) is not None:
+        return "PERC"
+    return "ABS" if _DEADBAND.get(obj) is not None else ""
+
+
+COLUMNS: List[Column] = [
+    Column("type", "type", keep_if_empty=True, widget="combo"),
+    Column("label", "label", keep_if_empty=True),
+    Column("unit", "unit", widget="combo", exact=True),
+    Column("trigger type", "sendPolicy.triggers[0].type", keep_if_empty=True, widget="combo", exact=True),
+    Column("level", "sendPolicy.triggers[0].level", "int"),
+    Column("mode", "sendPolicy.triggers[0].mode", keep_if_empty=True, widget="combo", exact=True),
+    Column("min interval ms", "sendPolicy.triggers[0].minIntervalMs", "int", minimum=0),
+    Column("skip first n changes", "sendPolicy.triggers[0].skipFirstNChanges", "int", minimum=0),
+    Column("change mask", "sendPolicy.triggers[0].changeMask", widget="combo", exact=True),
+    # deadband OR deadbandPercent, scritti insieme al tipo in row_to_property
+    Column("deadband", kind="float", get=_get_deadband),
+    Column("deadband type", widget="combo", exact=True, get=_get_deadband_type),   # ABS | PERC
 ]
+HEADERS = [c.header for c in COLUMNS]
 IDX = {h: i for i, h in enumerate(HEADERS)}
-NUMERIC_COLS = {IDX["level"], IDX["min interval ms"], IDX["skip first n changes"], IDX["deadband"]}
+NUMERIC_COLS = {i for i, c in enumerate(COLUMNS) if c.kind in NUMERIC_KINDS}
+
+
+def _compile_row(columns: List[Column]) -> Callable[[Any], List[Any]]:
+    """Funzione property -> riga con le letture di tutte le colonne in linea (una chiamata per riga)."""
+    lines = ["def row(o):"]
+    ns: Dict[str, Any] = {"intern": sys.intern}
+    for i, col in enumerate(columns):
+        if col.field is None:
+            ns[f"get{i}"] = col.get
+            lines.append(f"    v{i} = get{i}(o)")
+        else:
+            lines += ["    try:",
+                      f"        v{i} = {_field_expr(col.field.keys)}",
+                      "    except (KeyError, IndexError, TypeError):",
+                      f"        v{i} = None"]
+    # stesse regole di _intern; None (campo mancante o null) diventa cella vuota
+    cells = [f'"" if v{i} is None else intern(v{i}) if type(v{i}) is str else v{i}' for i in range(len(columns))]
+    lines.append("    return [" + ", ".join(f"({c})" for c in cells) + "]")
+    exec(compile("\n".join(lines) + "\n", "<riga>", "exec"), ns)
+    return ns["row"]
+
+
+_build_row = _compile_row(COLUMNS)
+
+
+def configure_columns(extra: Iterable[Column]):
+    """Aggiunge colonne allo schema; va chiamata prima di costruire l'editor.
+
+    Lo schema viene controllato per intero prima di modificarlo: in caso di errore resta com'era.
+    Un percorso non può coincidere né essere prefisso (o estensione) di quello di un'altra
+    colonna: la scrittura di una cancellerebbe o snaturerebbe il campo dell'altra.
+    """
+    extra = list(extra)
+    taken = {h.lower() for h in HEADERS} | {CSV_PATH_COL}
+    owned = [c.field for c in COLUMNS if c.field is not None] + [_DEADBAND, _DEADBAND_PERC]
+    for col in extra:
+        if col.header.lower() in taken:
+            raise ValueError(f"colonna '{col.header}' già definita")
+        if col.field is None:
+            raise ValueError(f"colonna '{col.header}': percorso mancante")
+        keys = col.field.keys
+        for other in owned:
+            n = min(len(keys), len(other.keys))
+            if keys[:n] == other.keys[:n]:
+                raise ValueError(f"colonna '{col.header}': il percorso '{col.field.text}' "
+                                 f"si sovrappone a '{other.text}'")
+        taken.add(col.header.lower())
+        owned.append(col.field)
+    for col in extra:
+        IDX[col.header] = len(HEADERS)
+        HEADERS.append(col.header)
+        COLUMNS.append(col)
+        if col.kind in NUMERIC_KINDS:
+            NUMERIC_COLS.add(IDX[col.header])
+    global _build_row
+    _build_row = _compile_row(COLUMNS)
+
+
+def load_column_schema(path: str) -> List[Column]:
+    """Colonne aggiuntive da file JSON: [{"header": ..., "path": ..., "kind": str|int|float|bool, "min", "max"}]."""
+    with open(path, "r", encoding="utf-8") as f:
+        spec = json.load(f)
+    if not isinstance(spec, list):
+        raise ValueError("atteso un elenco di colonne")
+    cols: List[Column] = []
+    for k, item in enumerate(spec, 1):
+        if not isinstance(item, dict) or not item.get("header") or not item.get("path"):
+            raise ValueError(f"colonna {k}: 'header' e 'path' obbligatori")
+        kind = item.get("kind", "str")
+        if kind not in COLUMN_KINDS:
+            raise ValueError(f"colonna {k}: tipo '{kind}' non valido ({', '.join(COLUMN_KINDS)})")
+        for bound in ("min", "max"):
+            if item.get(bound) is not None and (kind not in NUMERIC_KINDS or type(item[bound]) not in (int, float)):
+                raise ValueError(f"colonna {k}: '{bound}' deve essere un numero (solo per int/float)")
+        cols.append(Column(str(item["header"]), str(item["path"]), kind,
+                           minimum=item.get("min"), maximum=item.get("max")))
+    return cols
+
+
+def _intern(v: Any) -> Any:
+    # pool di stringhe condiviso fra i documenti aperti (type/unit/path ricorrono ovunque)
+    return sys.intern(v) if type(v) is str else v
+
+
+def property_to_row(obj: Dict[str, Any]) -> List[Any]:
+    """Riga tabella (ordine HEADERS) per una property."""
+    return _build_row(obj)
+
+
+def row_to_property(obj: Dict[str, Any], row: List[Any], path: str, errors: List[str],
+                    base: Optional[List[Any]] = None):
+    """Scrive una riga tabella nella property (validando); gli errori finiscono in `errors`.
+
+    Con `base` (la riga com'era su disco) scrive solo le celle cambiate: i campi non toccati
+    restano byte per byte come nel file (es. "deadband": 5 non diventa 5.0).
+    Chiamata con un dict vuoto serve anche come sola validazione.
+    """
+    for c, (col, value) in enumerate(zip(COLUMNS, row)):
+        if col.field is not None and (base is None or value != base[c]):
+            col.commit(obj, value, path, errors)
+
+    i_db, i_dbt = IDX["deadband"], IDX["deadband type"]
+    if base is not None and row[i_db] == base[i_db] and row[i_dbt] == base[i_dbt]:
+        return
+    tr = TRIGGER0.setdefault(obj)
+
+    db = row[i_db]
+    dbt = str(row[i_dbt]).strip().upper()
+
+    # deadband + tipo
+    try:
+        if str(dbt) == "":
+            tr.pop("deadband", None)
+            tr.pop("deadbandPercent", None)
+        elif dbt == "ABS":
+            if str(db).strip() == "":
+                tr.pop("deadband", None)
+                tr.pop("deadbandPercent", None)
+            else:
+                v = float(db)
+                if v < 0: raise ValueError
+                tr["deadband"] = v
+                tr.pop("deadbandPercent", None)
+        elif dbt == "PERC":
+            if str(db).strip() == "":
+                tr.pop("deadband", None)
+                tr.pop("deadbandPercent", None)
+            else:
+                v = float(db)
+                if not (0.0 <= v <= 100.0): raise ValueError
+                tr["deadbandPercent"] = v
+                tr.pop("deadband", None)
+        else:
+            errors.append(f"{path}: 'deadband type' deve essere ABS o PERC")
+    except Exception:
+        errors.append(f"{path}: 'deadband' non valido")
+
+# ----------------- Lettura con posizioni / salvataggio a patch -----------------
+Span = Tuple[int, int]
+_WS = re.compile(r"[ \t\n\r]*")
+_DECODER = json.JSONDecoder()
+
+
+def _scan_object(text: str, idx: int, member) -> Tuple[Dict[str, Any], int]:
+    """Oggetto JSON che inizia in text[idx]; `member(key, idx)` decodifica ogni valore -> (valore, fine)."""
+    if text[idx] != "{":
+        raise ValueError("oggetto atteso")
+    obj: Dict[str, Any] = {}
+    idx = _WS.match(text, idx + 1).end()
+    if text[idx] == "}":
+        return obj, idx + 1
+    while True:
+        if text[idx] != '"':
+            raise ValueError("chiave attesa")
+        key, idx = json.decoder.scanstring(text, idx + 1)
+        idx = _WS.match(text, idx).end()
+        if text[idx] != ":":
+            raise ValueError("':' atteso")
+        idx = _WS.match(text, idx + 1).end()
+        obj[key], idx = member(key, idx)
+        idx = _WS.match(text, idx).end()
+        if text[idx] == ",":
+            idx = _WS.match(text, idx + 1).end()
+        elif text[idx] == "}":
+            return obj, idx + 1
+        else:
+            raise ValueError("',' o '}' atteso")
+
+
+def _scan_properties(text: str, idx: int, spans: Dict[str, Span]) -> Tuple[Dict[str, Any], int]:
+    """Come _scan_object, specializzata (è il ciclo caldo): registra lo span di ogni property oggetto."""
+    ws = _WS.match
+    scanstring = json.decoder.scanstring
+    raw_decode = _DECODER.raw_decode
+    obj: Dict[str, Any] = {}
+    idx = ws(text, idx + 1).end()
+    if text[idx] == "}":
+        return obj, idx + 1
+    while True:
+        if text[idx] != '"':
+            raise ValueError("chiave attesa")
+        key, idx = scanstring(text, idx + 1)
+        idx = ws(text, idx).end()
+        if text[idx] != ":":
+            raise ValueError("':' atteso")
+        start = ws(text, idx + 1).end()
+        value, idx = raw_decode(text, start)
+        obj[key] = value
+        if type(value) is dict:
+            spans[key] = (start, idx)
+        idx = ws(text, idx).end()
+        c = text[idx]
+        if c == ",":
+            idx = ws(text, idx + 1).end()
+        elif c == "}":
+            return obj, idx + 1
+        else:
+            raise ValueError("',' o '}' atteso")
+
+
+def scan_mapping(text: str) -> Tuple[Dict[str, Any], Dict[str, Span], Dict[str, Span]]:
+    """Decodifica il mapping annotando dove sta ogni property nel testo.
+
+    Ritorna (data, {path: (inizio, fine) del valore}, {"name"/"instanceOf": span}).
+    Le property sono decodificate una volta sola con il decoder C (raw_decode).
+    """
+    found: Dict[str, Tuple[Dict[str, Span], Dict[str, Span]]] = {}
+
+    def scan_root(which: str):
+        props: Dict[str, Span] = {}
+        meta: Dict[str, Span] = {}
+        found[which] = (props, meta)
+
+        def member(key: str, idx: int):
+            if key == "properties" and text[idx] == "{":
+                props.clear()
+                return _scan_properties(text, idx, props)
+            if key == "json" and which == "top" and text[idx] == "{":
+                return _scan_object(text, idx, scan_root("json"))
+            value, end = _DECODER.raw_decode(text, idx)
+            if key in ("name", "instanceOf") and isinstance(value, str):
+                meta[key] = (idx, end)
+            return value, end
+        return member
+
+    # milioni di contenitori appena creati: il GC ciclico qui è solo costo
+    gc_was_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        idx = _WS.match(text).end()
+        data, end = _scan_object(text, idx, scan_root("top"))
+    finally:
+        if gc_was_enabled:
+            gc.enable()
+    if _WS.match(text, end).end() != len(text):
+        raise ValueError("contenuto dopo la fine del documento")
+
+    top_props, top_meta = found["top"]
+    if "json" in found and mapping_root(data) is not data:
+        props, root_meta = found["json"]
+    else:
+        props, root_meta = top_props, top_meta
+    # "name" sta al livello principale, "instanceOf" nel nodo con le properties (vedi _commit_table_to_json)
+    meta = {"name": top_meta["name"]} if "name" in top_meta else {}
+    if "instanceOf" in root_meta:
+        meta["instanceOf"] = root_meta["instanceOf"]
+    return data, props, meta
+
+
+def _newline_of(text: str) -> str:
+    i = text.find("\n")
+    return "\r\n" if i > 0 and text[i - 1] == "\r" else "\n"
+
+
+def dump_span(value: Any, text: str, start: int, end: int) -> str:
+    """Serializza `value` per sostituire text[start:end] con lo stesso stile (indentazione, a capo)."""
+    old = text[start:end]
+    if "\n" not in old:
+        return json.dumps(value, ensure_ascii=False)
+    line_start = text.rfind("\n", 0, start) + 1
+    indent = text[line_start:start]
+    indent = indent[:len(indent) - len(indent.lstrip(" \t"))]
+    # passo di indentazione: quanto la prima riga interna rientra rispetto alla riga del valore
+    inner = old[old.index("\n") + 1:]
+    step = inner[:len(inner) - len(inner.lstrip(" \t"))]
+    step = step[len(indent):] if step.startswith(indent) and len(step) > len(indent) else "  "
+    return json.dumps(value, indent=step, ensure_ascii=False).replace("\n", _newline_of(text) + indent)
+
+
+def splice(text: str, edits: List[Tuple[int, int, str]]) -> str:
+    """Sostituisce i tratti (inizio, fine, nuovo testo) non sovrapposti; il resto resta byte per byte."""
+    pieces: List[str] = []
+    pos = 0
+    for start, end, new in sorted(edits):
+        pieces.append(text[pos:start])
+        pieces.append(new)
+        pos = end
+    pieces.append(text[pos:])
+    return "".join(pieces)
+
+
+def shift_spans(spans: Dict[str, Span], edits: List[Tuple[int, int, str]]) -> Dict[str, Span]:
+    """Posizioni dopo splice(): i tratti modificati prendono la nuova lunghezza, i successivi slittano."""
+    edits = sorted(edits)
+    starts = [e[0] for e in edits]
+    delta = [0]
+    for start, end, new in edits:
+        delta.append(delta[-1] + len(new) - (end - start))
+    if not any(delta):
+        return spans
+    out: Dict[str, Span] = {}
+    first = starts[0]
+    for key, span in spans.items():
+        a, b = span
+        if a < first:
+            out[key] = span
+            continue
+        k = bisect_right(starts, a)
+        if k and starts[k - 1] == a:
+            a2 = a + delta[k - 1]
+            out[key] = (a2, a2 + len(edits[k - 1][2]))
+        else:
+            out[key] = (a + delta[k], b + delta[k])
+    return out
+
+
+def read_mapping(path: str) -> Tuple[Any, str, Optional[Dict[str, Span]], Dict[str, Span]]:
+    """Legge il file: (data, testo, span delle property, span meta).
+
+    Se la struttura non è quella attesa gli span sono None e il salvataggio sarà completo.
+    """
+    with open(path, "r", encoding="utf-8", newline="") as f:
+        text = f.read()
+    try:
+        data, spans, meta = scan_mapping(text)
+    except (ValueError, IndexError):
+        return json.loads(text), text, None, {}
+    return data, text, spans, meta
+
+# ----------------- Riepilogo per gruppo -----------------
+SUMMARY_KEYS = ["type", "unit", "trigger type", "mode", "deadband type"]
+SUMMARY_METRICS = ["min interval ms", "deadband"]
+
+
+def _to_float(v: Any) -> Optional[float]:
+    if v is None or str(v).strip() == "":
+        return None
+    try:
+        return float(v)
+    except (TypeError, ValueError):
+        return None
+
+
+class GroupSummary:
+    """Conteggio e min/max/media delle metriche per gruppo, per tutte le SUMMARY_KEYS.
+
+    Costruito in un passaggio e poi aggiornato riga per riga (remove vecchia + add nuova).
+    Di ogni metrica si tengono solo min e max con quante righe li raggiungono: un estremo
+    va ricalcolato (scorrendo le righe) solo quando l'ultima riga che lo aveva cambia.
+    rows() tiene in cache il risultato per chiave e rifà solo i gruppi toccati.
+    """
+
+    def __init__(self):
+        # key -> valore gruppo -> [count, {metrica: [n, somma, min, n_min, max, n_max]}]
+        # (min/max None con n > 0: estremo da ricalcolare)
+        self.groups: Dict[str, Dict[str, list]] = {k: {} for k in SUMMARY_KEYS}
+        self._cache: Dict[str, Dict[str, tuple]] = {k: {} for k in SUMMARY_KEYS}
+        self._dirty: Dict[str, set] = {k: set() for k in SUMMARY_KEYS}
+        self._sorted: Dict[str, Optional[list]] = {k: None for k in SUMMARY_KEYS}
+
+    def clear(self):
+        for key in SUMMARY_KEYS:
+            self.groups[key].clear()
+            self._cache[key].clear()
+            self._dirty[key].clear()
+            self._sorted[key] = None
+
+    def add(self, row: List[Any]):
+        self._update(row, 1)
+
+    def remove(self, row: List[Any]):
+        self._update(row, -1)
+
+    def _update(self, row: List[Any], sign: int):
+        metrics = [(m, _to_float(row[IDX[m]])) for m in SUMMARY_METRICS]
+        for key in SUMMARY_KEYS:
+            gval = str(row[IDX[key]]).strip()
+            groups = self.groups[key]
+            g = groups.get(gval)
+            if g is None:
+                g = groups[gval] = [0, {m: [0, 0.0, None, 0, None, 0] for m in SUMMARY_METRICS}]
+            g[0] += sign
+            self._dirty[key].add(gval)
+            for m, v in metrics:
+                if v is None:
+                    continue
+                st = g[1][m]
+                st[0] += sign
+                st[1] += sign * v
+                if sign > 0:
+                    if st[0] == 1:
+                        st[2:] = [v, 1, v, 1]
+                        continue
+                    if st[2] is not None:
+                        if v < st[2]:
+                            st[2], st[3] = v, 1
+                        elif v == st[2]:
+                            st[3] += 1
+                    if st[4] is not None:
+                        if v > st[4]:
+                            st[4], st[5] = v, 1
+                        elif v == st[4]:
+                            st[5] += 1
+                elif st[0] <= 0:
+                    st[:] = [0, 0.0, None, 0, None, 0]
+                else:
+                    if v == st[2]:
+                        st[3] -= 1
+                        if st[3] == 0:
+                            st[2] = None
+                    if v == st[4]:
+                        st[5] -= 1
+                        if st[5] == 0:
+                            st[4] = None
+            if g[0] <= 0:
+                del groups[gval]
+
+    def _rescan(self, key: str, stale: Dict[str, list], all_rows: List[List[Any]]):
+        """Ricalcola gli estremi persi dei gruppi in `stale` con un passaggio sulle righe."""
+        seen: Dict[Tuple[str, str], list] = {}
+        col = IDX[key]
+        for row in all_rows:
+            gval = str(row[col]).strip()
+            if gval not in stale:
+                continue
+            for m in stale[gval]:
+                v = _to_float(row[IDX[m]])
+                if v is None:
+                    continue
+                ext = seen.get((gval, m))
+                if ext is None:
+                    seen[(gval, m)] = [v, 1, v, 1]
+                    continue
+                if v < ext[0]:
+                    ext[0], ext[1] = v, 1
+                elif v == ext[0]:
+                    ext[1] += 1
+                if v > ext[2]:
+                    ext[2], ext[3] = v, 1
+                elif v == ext[2]:
+                    ext[3] += 1
+        for (gval, m), ext in seen.items():
+            self.groups[key][gval][1][m][2:] = ext
+
+    def rows(self, key: str, all_rows: List[List[Any]]) -> List[Tuple[str, int, Dict[str, Optional[Tuple[float, float, float]]]]]:
+        """(gruppo, count, {metrica: (min, max, media) | None}) ordinati per count decrescente.
+
+        `all_rows` sono le righe sommate finora: servono solo se un estremo va ricalcolato.
+        """
+        groups = self.groups.get(key)
+        if groups is None:
+            return []
+        dirty = self._dirty[key]
+        if dirty or self._sorted[key] is None:
+            stale = {gval: [m for m, st in groups[gval][1].items()
+                            if st[0] > 0 and (st[2] is None or st[4] is None)]
+                     for gval in dirty if gval in groups}
+            stale = {gval: ms for gval, ms in stale.items() if ms}
+            if stale:
+                self._rescan(key, stale, all_rows)
+            cache = self._cache[key]
+            for gval in dirty:
+                g = groups.get(gval)
+                if g is None:
+                    cache.pop(gval, None)
+                    continue
+                count, stats = g
+                agg: Dict[str, Optional[Tuple[float, float, float]]] = {}
+                for m, (n, total, lo, _, hi, _) in stats.items():
+                    agg[m] = (lo, hi, total / n) if n > 0 else None
+                cache[gval] = (gval, count, agg)
+            dirty.clear()
+            self._sorted[key] = sorted(cache.values(), key=lambda r: (-r[1], r[0].lower()))
+        return self._sorted[key]
+
+# ----------------- Albero dei percorsi -----------------
+PATH_SEPARATORS = ("/", ".", "\\", ":")
+
+
+def detect_path_separator(paths: List[str], sample: int = 1000) -> str:
+    """Separatore più diffuso tra i primi `sample` path (default '/')."""
+    counts = {sep: 0 for sep in PATH_SEPARATORS}
+    for p in paths[:sample]:
+        for sep in PATH_SEPARATORS:
+            if sep in p:
+                counts[sep] += 1
+    best = max(PATH_SEPARATORS, key=lambda sep: counts[sep])
+    return best if counts[best] else PATH_SEPARATORS[0]
+
+
+class PathTree:
+    """Indice per prefisso dei path, ordinato per segmenti.
+
+    Le chiavi sono i path col separatore sostituito da "\\0": ordinare queste stringhe
+    equivale a ordinare per segmenti, quindi tutti i path sotto un prefisso sono
+    contigui e sottoalbero e figli di un nodo si trovano con bisect.
+    """
+
+    def __init__(self):
+        self.sep = PATH_SEPARATORS[0]
+        self.keys: List[str] = []
+        self.rows: List[int] = []
+
+    def build(self, paths: List[str]):
+        self.sep = detect_path_separator(paths)
+        keys = [p.replace(self.sep, "\0") for p in paths]
+        self.rows = sorted(range(len(keys)), key=keys.__getitem__)
+        self.keys = [keys[i] for i in self.rows]
+
+    def join(self, prefix: Tuple[str, ...]) -> str:
+        return self.sep.join(prefix)
+
+    def _range(self, key: str, lo: int = 0, hi: Optional[int] = None) -> Tuple[int, int]:
+        # [key, key + "\1"): il nodo stesso e tutto ciò che inizia con key + "\0"
+        if hi is None:
+            hi = len(self.keys)
+        return bisect_left(self.keys, key, lo, hi), bisect_left(self.keys, key + "\1", lo, hi)
+
+    def _prefix_range(self, prefix: Tuple[str, ...]) -> Tuple[int, int]:
+        if not prefix:
+            return 0, len(self.keys)
+        return self._range("\0".join(prefix))
+
+    def count(self, prefix: Tuple[str, ...]) -> int:
+        lo, hi = self._prefix_range(prefix)
+        return hi - lo
+
+    def children(self, prefix: Tuple[str, ...], limit: int = TREE_MAX_CHILDREN
+                 ) -> Tuple[List[Tuple[str, int, bool]], int]:
+        """Figli diretti di `prefix`: ([(segmento, n. property, ha figli)], n. property dei figli oltre `limit`)."""
+        lo, hi = self._prefix_range(prefix)
+        base = "\0".join(prefix) + "\0" if prefix else ""
+        out: List[Tuple[str, int, bool]] = []
+        pos = lo
+        while pos < hi:
+            key = self.keys[pos]
+            if len(key) < len(base):   # il prefisso stesso è una property
+                pos += 1
+                continue
+            if len(out) >= limit:
+                return out, hi - pos
+            seg = key[len(base):].split("\0", 1)[0]
+            child = base + seg
+            _, nxt = self._range(child, pos, hi)
+            out.append((seg, nxt - pos, self.keys[nxt - 1] != child))
+            pos = nxt
+        return out, 0
+
+    def rows_under(self, prefix: Tuple[str, ...]) -> List[int]:
+        """Indici riga (ordinati) delle property sotto `prefix`."""
+        lo, hi = self._prefix_range(prefix)
+        return sorted(self.rows[lo:hi])
+
+# ----------------- Controllo duplicati / conflitti -----------------
+ISSUE_KINDS = {
+    "label": "label duplicata",
+    "path": "path diversi solo per maiuscole",
+    "policy": "sendPolicy contraddittorie",
+}
+
+
+def _fingerprint(value: Any) -> str:
+    """Forma canonica (chiavi ordinate, senza spazi) per confronti via hash."""
+    return json.dumps(value, sort_keys=True, separators=(",", ":"), ensure_ascii=False, default=str)
+
+
+def find_issues(items: Iterable[Tuple[str, Dict[str, Any]]]) -> List[Tuple[str, str, List[str]]]:
+    """Duplicati e conflitti in un solo passaggio: [(tipo, chiave, path coinvolti)].
+
+    - label uguale su più property;
+    - path uguali a meno di maiuscole/minuscole;
+    - property con resto identico (sendPolicy esclusa, label compresa anche se assente)
+      ma sendPolicy diverse.
+    """
+    by_label: Dict[str, List[str]] = {}
+    by_norm_path: Dict[str, List[str]] = {}
+    # property con corpo identico hanno per forza stessa label, type, unit e n. di chiavi: si raggruppa
+    # per questa chiave economica e le impronte complete si calcolano solo nei gruppi con più membri
+    by_shape: Dict[Tuple[Any, ...], List[Tuple[str, Dict[str, Any]]]] = {}
+
+    # come in scan_mapping: centinaia di migliaia di contenitori nuovi, il GC ciclico è solo costo
+    gc_was_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        for path, obj in items:
+            by_norm_path.setdefault(path.strip().casefold(), []).append(path)
+            label = str(obj.get("label", "")).strip()
+            if label:
+                by_label.setdefault(label, []).append(path)
+            shape = (label, str(obj.get("type")), str(obj.get("unit")), len(obj) - ("sendPolicy" in obj))
+            by_shape.setdefault(shape, []).append((path, obj))
+    finally:
+        if gc_was_enabled:
+            gc.enable()
+
+    issues: List[Tuple[str, str, List[str]]] = []
+    for label, paths in by_label.items():
+        if len(paths) > 1:
+            issues.append(("label", label, paths))
+    for paths in by_norm_path.values():
+        if len(paths) > 1:
+            issues.append(("path", paths[0], paths))
+    for (label, *_), group in by_shape.items():
+        if len(group) < 2:
+            continue
+        by_body: Dict[str, Dict[str, List[str]]] = {}
+        for path, obj in group:
+            body = _fingerprint({k: v for k, v in obj.items() if k != "sendPolicy"})
+            by_body.setdefault(body, {}).setdefault(_fingerprint(obj.get("sendPolicy")), []).append(path)
+        for policies in by_body.values():
+            if len(policies) > 1:
+                paths = [p for ps in policies.values() for p in ps]
+                issues.append(("policy", label or paths[0], paths))
+    return issues
+
+# ----------------- CSV (export / import per path) -----------------
+CSV_PATH_COL = "path"
+
+
+def export_csv(csv_path: str, paths: Iterable[str], rows: Iterable[List[Any]]) -> int:
+    """Scrive le righe una alla volta (colonna 'path' + HEADERS); ritorna il numero di righe."""
+    n = 0
+    with open(csv_path, "w", encoding="utf-8-sig", newline="") as f:
+        w = csv.writer(f)
+        w.writerow([CSV_PATH_COL] + HEADERS)
+        for path, row in zip(paths, rows):
+            w.writerow([path] + ["" if v is None else v for v in row])
+            n += 1
+    return n
+
+
+def iter_csv_rows(csv_path: str) -> Iterator[Tuple[int, str, List[Tuple[int, str]]]]:
+    """Legge il CSV in streaming: (n. riga, path, [(colonna HEADERS, valore), ...]).
+
+    Le colonne sono riconosciute per nome (ordine libero, quelle sconosciute ignorate);
+    il separatore (, ; TAB) è dedotto dall'intestazione.
+    """
+    with open(csv_path, "r", encoding="utf-8-sig", newline="") as f:
+        head = f.readline()
+        try:
+            dialect = csv.Sniffer().sniff(head, delimiters=",;\t")
+        except csv.Error:
+            dialect = csv.excel
+        names = [c.strip().lower() for c in next(csv.reader([head], dialect), [])]
+        if CSV_PATH_COL not in names:
+            raise ValueError(f"Colonna '{CSV_PATH_COL}' mancante nell'intestazione")
+        path_col = names.index(CSV_PATH_COL)
+        by_name = {h.lower(): i for i, h in enumerate(HEADERS)}
+        mapped = [(k, by_name[name]) for k, name in enumerate(names) if name in by_name]
+
+        reader = csv.reader(f, dialect)
+        for rec in reader:
+            if len(rec) <= path_col or not rec[path_col]:
+                continue
+            vals = [(col, rec[k].strip()) for k, col in mapped if k < len(rec)]
+            yield reader.line_num + 1, rec[path_col], vals
+
+
+# ----------------- Journal (recupero dopo crash) -----------------
+def journal_path(file_path: str) -> str:
+    return file_path + JOURNAL_SUFFIX
+
+
+def read_journal(jpath: str) -> Tuple[Dict[Tuple[str, str], Any], Dict[str, str]]:
+    """Rilegge il journal: ({(path, colonna): valore}, {campo meta: valore}), vince l'ultima scrittura.
+
+    Righe illeggibili (es. troncate da un crash a metà scrittura) vengono ignorate.
+    """
+    cells: Dict[Tuple[str, str], Any] = {}
+    meta: Dict[str, str] = {}
+    try:
+        f = open(jpath, "r", encoding="utf-8")
+    except FileNotFoundError:
+        return cells, meta
+    with f:
+        for line in f:
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                continue
+            if not isinstance(entry, dict):
+                continue
+            if "m" in entry:
+                meta[entry["m"]] = entry.get("v", "")
+            elif "p" in entry and "f" in entry:
+                cells[(entry["p"], entry["f"])] = entry.get("v", "")
+    return cells, meta
+
+
+def _journal_line(entry: Dict[str, Any]) -> str:
+    return json.dumps(entry, ensure_ascii=False, default=str) + "\n"
+
+
+def compact_journal(jpath: str) -> int:
+    """Riscrive il journal con un solo valore per cella (sostituzione atomica); ritorna le voci rimaste."""
+    cells, meta = read_journal(jpath)
+    if not cells and not meta:
+        try:
+            os.remove(jpath)
+        except FileNotFoundError:
+            pass
+        return 0
+    tmp = jpath + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        for key, value in meta.items():
+            f.write(_journal_line({"m": key, "v": value}))
+        for (path, field), value in cells.items():
+            f.write(_journal_line({"p": path, "f": field, "v": value}))
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, jpath)
+    return len(cells) + len(meta)
+
+# ----------------- Documenti (schede) -----------------
+# Attributi di MappingEditor che descrivono il documento attivo; le schede inattive
+# li conservano in un dict e vengono scambiati al cambio scheda.
+DOC_ATTRS = (
+    "file_path", "data", "property_items",
+    "domain_types", "domain_units", "domain_trig_types", "domain_trig_modes", "domain_change_masks",
+    "rows_all", "rows_base", "row_to_path", "path_index", "summary", "path_tree", "issues",
+    "_file_sig", "conflict_paths", "_scope_prefix", "_scope_paths", "_group_filter",
+    "_raw_text", "_spans", "_meta_spans",
+    "_last_sort_col", "_last_sort_asc", "sort_dir_by_col",
+)
+# Parte ricostruibile dalla cache compressa: è ciò che viene liberato quando una scheda è scaricata.
+DOC_HEAVY_ATTRS = (
+    "data", "property_items",
+    "domain_types", "domain_units", "domain_trig_types", "domain_trig_modes", "domain_change_masks",
+    "rows_all", "rows_base", "row_to_path", "path_index", "summary", "path_tree", "issues",
+    "_raw_text", "_spans", "_meta_spans",
+)
 
 
 class MappingEditor(ttk.Frame):
@@ -145,6 +1072,22 @@ class MappingEditor(ttk.Frame):
         self.rows_view: List[List[Any]] = []
         self.row_to_path: List[str] = []
         self.view_index_map: List[int] = []
+        # Righe come da file (per capire cosa è stato modificato) e indice path -> riga
+        self.rows_base: List[List[Any]] = []
+        self.path_index: Dict[str, int] = {}
+        self.summary = GroupSummary()
+        self.path_tree = PathTree()
+        self._scope_prefix: Optional[Tuple[str, ...]] = None
+        self._scope_paths: Optional[List[str]] = None
+        # gruppo del riepilogo scelto col click: (colonna, valore come chiave di GroupSummary)
+        self._group_filter: Optional[Tuple[str, str]] = None
+        self.issues: List[Tuple[str, str, List[str]]] = []
+        self._tree_nodes: Dict[str, Tuple[str, ...]] = {}
+
+        # Osservazione file (ricarica incrementale)
+        self._file_sig: Optional[Tuple[int, int]] = None
+        self._watch_job: Optional[str] = None
+        self.conflict_paths: set = set()
 
         # Stato ordinamento globale
         self._last_sort_col: Optional[int] = None
@@ -159,9 +1102,27 @@ class MappingEditor(ttk.Frame):
         self.sort_dir_by_col: Dict[int, bool] = {}
         self.sort_buttons: Dict[int, ttk.Button] = {}
 
+        # Schede: stato dei documenti inattivi (vedi DOC_ATTRS) e indice di quello attivo
+        self.docs: List[Dict[str, Any]] = []
+        self.active_doc: Optional[int] = None
+        self._use_counter = 0
+
+        # Journal: righe in attesa di scrittura per file e ultimo meta registrato
+        self._journal_buf: Dict[str, List[str]] = {}
+        self._journal_meta: Dict[str, Tuple[str, str]] = {}
+        self._journal_job: Optional[str] = None
+
         # Meta (GUI)
         self.var_name = tk.StringVar(value="")
         self.var_instance = tk.StringVar(value="")
+        self.var_watch = tk.BooleanVar(value=False)
+        self.var_patch_save = tk.BooleanVar(value=True)
+        self.var_summary_key = tk.StringVar(value=SUMMARY_KEYS[0])
+        self.var_issue_kind = tk.StringVar(value="tutti")
+        # anche una modifica al solo name/instanceOf deve finire nel journal: il confronto si fa
+        # al flush, quando entrambi i campi sono assestati (load/cambio scheda li scrivono in sequenza)
+        for var in (self.var_name, self.var_instance):
+            var.trace_add("write", lambda *_: self._schedule_journal_flush())
 
         self._build_ui()
 
@@ -177,16 +1138,26 @@ Installa con: pip install tksheet"""
             return
 
         self.columnconfigure(0, weight=1)
-        self.rowconfigure(2, weight=1)
+        self.rowconfigure(3, weight=1)
 
         # Toolbar
         toolbar = ttk.Frame(self)
         toolbar.grid(row=0, column=0, sticky="ew", padx=6, pady=(6, 3))
         ttk.Button(toolbar, text="Apri…", command=self.on_open).pack(side=tk.LEFT)
+        self.btn_close = ttk.Button(toolbar, text="Chiudi", command=self.on_close_tab, state=tk.DISABLED)
+        self.btn_close.pack(side=tk.LEFT, padx=(6, 0))
         self.btn_save = ttk.Button(toolbar, text="Salva", command=self.on_save, state=tk.DISABLED)
         self.btn_save.pack(side=tk.LEFT, padx=(6, 0))
         self.btn_save_as = ttk.Button(toolbar, text="Salva come…", command=self.on_save_as, state=tk.DISABLED)
         self.btn_save_as.pack(side=tk.LEFT, padx=(6, 0))
+        self.btn_export_csv = ttk.Button(toolbar, text="Esporta CSV…", command=self.on_export_csv, state=tk.DISABLED)
+        self.btn_export_csv.pack(side=tk.LEFT, padx=(12, 0))
+        self.btn_import_csv = ttk.Button(toolbar, text="Importa CSV…", command=self.on_import_csv, state=tk.DISABLED)
+        self.btn_import_csv.pack(side=tk.LEFT, padx=(6, 0))
+        ttk.Checkbutton(toolbar, text="Osserva file", variable=self.var_watch,
+                        command=self._on_toggle_watch).pack(side=tk.LEFT, padx=(12, 0))
+        ttk.Checkbutton(toolbar, text="Salva solo modifiche",
+                        variable=self.var_patch_save).pack(side=tk.LEFT, padx=(6, 0))
 
         # Stili compatti
         style = ttk.Style(self)
@@ -195,14 +1166,37 @@ Installa con: pip install tksheet"""
         style.configure("Small.TCombobox", padding=(2, 1))
         style.configure("Small.TButton", padding=(2, 0))
 
+        # Schede (solo intestazioni: tabella e pannelli sono condivisi)
+        self.tabs = ttk.Notebook(self, height=0)
+        self.tabs.grid(row=1, column=0, sticky="ew", padx=6, pady=(0, 3))
+        self.tabs.bind("<<NotebookTabChanged>>", self._on_tab_changed)
+
         # Filtro per colonna
         self.filter_bar = ttk.Frame(self)
-        self.filter_bar.grid(row=1, column=0, sticky="ew", padx=6, pady=(0, 3))
+        self.filter_bar.grid(row=2, column=0, sticky="ew", padx=6, pady=(0, 3))
         self._build_filters(self.filter_bar)
 
         # Paned (tabella principale)
         paned = ttk.Panedwindow(self, orient=tk.HORIZONTAL)
-        paned.grid(row=2, column=0, sticky="nsew", padx=6, pady=(0, 6))
+        paned.grid(row=3, column=0, sticky="nsew", padx=6, pady=(0, 6))
+
+        # albero percorsi (espansione lazy)
+        self.nav = ttk.Frame(paned)
+        self.nav.rowconfigure(1, weight=1)
+        self.nav.columnconfigure(0, weight=1)
+        ttk.Button(self.nav, text="Tutti i percorsi", style="Small.TButton",
+                   command=self._clear_scope).grid(row=0, column=0, columnspan=2, sticky="ew", pady=(0, 2))
+        self.path_view = ttk.Treeview(self.nav, columns=("n",), show="tree headings", selectmode="browse")
+        self.path_view.heading("#0", text="percorso")
+        self.path_view.heading("n", text="n")
+        self.path_view.column("#0", width=160, stretch=True)
+        self.path_view.column("n", width=50, anchor="e", stretch=False)
+        self.path_view.grid(row=1, column=0, sticky="nsew")
+        sb_nav = ttk.Scrollbar(self.nav, orient=tk.VERTICAL, command=self.path_view.yview)
+        sb_nav.grid(row=1, column=1, sticky="ns")
+        self.path_view.configure(yscrollcommand=sb_nav.set)
+        self.path_view.bind("<<TreeviewOpen>>", self._on_tree_open)
+        self.path_view.bind("<<TreeviewSelect>>", self._on_tree_select)
 
         # left: tksheet
         self.left = ttk.Frame(paned)
@@ -254,6 +1248,10 @@ Installa con: pip install tksheet"""
             self.sheet.extra_bind("double_click_cell", self._on_double_click_cell)
         except Exception:
             pass
+        try:
+            self.sheet.bind("<<SheetModified>>", self._on_sheet_modified)
+        except Exception:
+            pass
 
         # right: pannello meta + note
         self.right = ttk.Frame(paned)
@@ -270,46 +1268,78 @@ Installa con: pip install tksheet"""
             row=1, column=1, sticky="ew", padx=(2, 4), pady=2
         )
 
-        ttk.Label(self.right, text="Dettagli (opz.)", foreground="#666").pack(anchor="w", padx=8, pady=8)
-        ttk.Label(
-            self.right,
-            text=(
-                """La maggior parte dell'editing avviene direttamente in tabella.
-A destra puoi inserire funzioni future (diff, preset, ecc.)"""
-            ),
-            wraplength=260,
-            foreground="#666",
-        ).pack(anchor="w", padx=8)
-
+        # Riepilogo per gruppo (click su un gruppo = filtro)
+        summ = ttk.LabelFrame(self.right, text="Riepilogo")
+        summ.pack(fill="both", expand=True, padx=8, pady=(4, 8))
+        summ.columnconfigure(0, weight=1)
+        summ.rowconfigure(1, weight=1)
+        cb = ttk.Combobox(summ, textvariable=self.var_summary_key, values=SUMMARY_KEYS,
+                          state="readonly", width=16, style="Small.TCombobox")
+        cb.grid(row=0, column=0, columnspan=2, sticky="w", padx=4, pady=(2, 4))
+        cb.bind("<<ComboboxSelected>>", lambda e: self._refresh_summary())
+        self.summary_tree = ttk.Treeview(summ, columns=("n", "interval", "deadband"), show="tree headings",
+                                         height=12, selectmode="browse")
+        self.summary_tree.heading("#0", text="gruppo")
+        self.summary_tree.heading("n", text="n")
+        self.summary_tree.heading("interval", text="min interval ms (min/max/media)")
+        self.summary_tree.heading("deadband", text="deadband (min/max/media)")
+        self.summary_tree.column("#0", width=90, stretch=True)
+        self.summary_tree.column("n", width=50, anchor="e", stretch=False)
+        self.summary_tree.column("interval", width=150, stretch=True)
+        self.summary_tree.column("deadband", width=150, stretch=True)
+        self.summary_tree.grid(row=1, column=0, sticky="nsew")
+        sb = ttk.Scrollbar(summ, orient=tk.VERTICAL, command=self.summary_tree.yview)
+        sb.grid(row=1, column=1, sticky="ns")
+        self.summary_tree.configure(yscrollcommand=sb.set)
+        self.summary_tree.bind("<<TreeviewSelect>>", self._on_summary_select)
+
+        # Problemi (duplicati / conflitti): click = vista ristretta ai path coinvolti
+        iss = ttk.LabelFrame(self.right, text="Problemi")
+        iss.pack(fill="both", expand=True, padx=8, pady=(0, 8))
+        iss.columnconfigure(1, weight=1)
+        iss.rowconfigure(1, weight=1)
+        ttk.Button(iss, text="Controlla", style="Small.TButton", command=self.on_check_issues).grid(
+            row=0, column=0, sticky="w", padx=4, pady=(2, 4)
+        )
+        cb_kind = ttk.Combobox(iss, textvariable=self.var_issue_kind, values=["tutti"] + list(ISSUE_KINDS.values()),
+                               state="readonly", width=28, style="Small.TCombobox")
+        cb_kind.grid(row=0, column=1, columnspan=2, sticky="w", padx=4, pady=(2, 4))
+        cb_kind.bind("<<ComboboxSelected>>", lambda e: self._refresh_issues_view())
+        self.issues_tree = ttk.Treeview(iss, columns=("kind", "n"), show="tree headings",
+                                        height=8, selectmode="browse")
+        self.issues_tree.heading("#0", text="chiave")
+        self.issues_tree.heading("kind", text="tipo")
+        self.issues_tree.heading("n", text="n")
+        self.issues_tree.column("#0", width=140, stretch=True)
+        self.issues_tree.column("kind", width=140, stretch=True)
+        self.issues_tree.column("n", width=40, anchor="e", stretch=False)
+        self.issues_tree.grid(row=1, column=0, columnspan=2, sticky="nsew")
+        sb_iss = ttk.Scrollbar(iss, orient=tk.VERTICAL, command=self.issues_tree.yview)
+        sb_iss.grid(row=1, column=2, sticky="ns")
+        self.issues_tree.configure(yscrollcommand=sb_iss.set)
+        self.issues_tree.bind("<<TreeviewSelect>>", self._on_issue_select)
+
+        paned.add(self.nav, weight=1)
         paned.add(self.left, weight=4)
         paned.add(self.right, weight=1)
         try:
-            self.after(50, lambda: paned.sashpos(0, max(500, self.winfo_width() - 360)))
+            def place_sashes():
+                paned.sashpos(0, 220)
+                paned.sashpos(1, max(720, self.winfo_width() - 360))
+            self.after(50, place_sashes)
         except Exception:
             pass
 
         # Statusbar
         self.status = tk.StringVar(value="Apri un file JSON di mapping…")
-        ttk.Label(self, textvariable=self.status, anchor="w").grid(row=3, column=0, sticky="ew", padx=6, pady=(0, 6))
+        ttk.Label(self, textvariable=self.status, anchor="w").grid(row=4, column=0, sticky="ew", padx=6, pady=(0, 6))
 
     def _build_filters(self, parent: ttk.Frame):
         self.filters: Dict[str, tk.Variable] = {}
         grid = ttk.Frame(parent)
         grid.pack(fill="x")
 
-        coldefs = [
-            ("type", "combo"),
-            ("label", "text"),
-            ("unit", "combo"),
-            ("trigger type", "combo"),
-            ("level", "text"),
-            ("mode", "combo"),
-            ("min interval ms", "text"),
-            ("skip first n changes", "text"),
-            ("change mask", "combo"),
-            ("deadband", "text"),
-            ("deadband type", "combo"),
-        ]
+        coldefs = [(c.header, c.widget) for c in COLUMNS]
 
         for i, (name, kind) in enumerate(coldefs):
             grid.columnconfigure(i, weight=1)
@@ -347,22 +1377,74 @@ A destra puoi inserire funzioni future (diff, preset, ecc.)"""
         if not path:
             return
         try:
-            with open(path, "r", encoding="utf-8") as f:
-                self.data = json.load(f)
-            self.file_path = path
-            self.btn_save.config(state=tk.NORMAL)
-            self.btn_save_as.config(state=tk.NORMAL)
-            self.status.set(f"Caricato: {os.path.basename(path)}")
-            self._reindex()
+            self.open_document(path)
         except Exception as e:
             messagebox.showerror(APP_TITLE, f"""Errore apertura file:
 {e}""")
 
-    def on_save(self):
+    def open_document(self, path: str):
+        """Apre `path` in una nuova scheda (o passa alla scheda che lo ha già aperto)."""
+        target = os.path.normcase(os.path.abspath(path))
+        for k in range(len(self.docs)):
+            fp = self.file_path if k == self.active_doc else self.docs[k].get("file_path")
+            if fp and os.path.normcase(os.path.abspath(fp)) == target:
+                self.tabs.select(k)
+                self._activate_doc(k)
+                return
+
+        prev = self.active_doc
+        self._stash_active()
+        doc = self._blank_doc()
+        self.docs.append(doc)
+        self.active_doc = len(self.docs) - 1
+        self._load_doc_state(doc)
+        self.tabs.add(ttk.Frame(self.tabs, height=0), text=os.path.basename(path))
+        try:
+            self.load_file(path)
+        except Exception:
+            self.docs.pop()
+            self.active_doc = None
+            self.tabs.forget(len(self.docs))
+            if prev is not None:
+                self.tabs.select(prev)
+                self._activate_doc(prev)
+            raise
+        self.tabs.select(self.active_doc)
+        self._touch_doc(self.active_doc)
+        self._enforce_doc_budget()
+
+    def load_file(self, path: str):
+        self.data, self._raw_text, self._spans, self._meta_spans = read_mapping(path)
+        self.file_path = path
+        self._file_sig = file_signature(path)
+        self.conflict_paths.clear()
+        self._set_doc_buttons(tk.NORMAL)
+        self.status.set(f"Caricato: {os.path.basename(path)}")
+        # prima di _reindex: il meta letto dal file non è una modifica da mettere nel journal
+        self._journal_meta[path] = self._meta_from_data()
+        self._reindex()
+        self._recover_journal()
+
+    def _set_doc_buttons(self, state: str):
+        for btn in (self.btn_close, self.btn_save, self.btn_save_as, self.btn_export_csv, self.btn_import_csv):
+            btn.config(state=state)
+
+    def on_save(self) -> bool:
         if not (self.file_path and self.data):
-            return
+            return False
         try:
-            self._commit_table_to_json()
+            patch = self.var_patch_save.get()
+            self._commit_table_to_json(only_dirty=patch)
+            patched = self._patched_text() if patch else None
+            if patched is not None:
+                text, spans, meta_spans = patched
+            else:
+                nl = _newline_of(self._raw_text) if self._raw_text else os.linesep
+                text = json.dumps(self.data, indent=2, ensure_ascii=False).replace("\n", nl)
+                try:
+                    _, spans, meta_spans = scan_mapping(text)
+                except (ValueError, IndexError):
+                    spans, meta_spans = None, {}
 
             bak = self.file_path + ".bak"
             try:
@@ -373,12 +1455,26 @@ A destra puoi inserire funzioni future (diff, preset, ecc.)"""
             except Exception:
                 pass
 
-            with open(self.file_path, "w", encoding="utf-8") as f:
-                json.dump(self.data, f, indent=2, ensure_ascii=False)
-            self.status.set(f"Salvato: {self.file_path}")
+            with open(self.file_path, "w", encoding="utf-8", newline="") as f:
+                f.write(text)
+            self._raw_text, self._spans, self._meta_spans = text, spans, meta_spans
+            # il file ora coincide con la tabella: nuova base, nessun conflitto pendente
+            self._file_sig = file_signature(self.file_path)
+            for i, row in enumerate(self.rows_all):
+                if row != self.rows_base[i]:
+                    self.rows_base[i] = list(row)
+            self.conflict_paths.clear()
+            self._refresh_highlights()
+            # tutto è su disco: il journal non serve più
+            self._discard_journal(self.file_path)
+            self._journal_meta[self.file_path] = self._meta_from_data()
+            how = "solo modifiche" if patched is not None else "completo"
+            self.status.set(f"Salvato ({how}): {self.file_path}")
+            return True
         except Exception as e:
             messagebox.showerror(APP_TITLE, f"""Errore salvataggio:
 {e}""")
+            return False
 
     def on_save_as(self):
         if not self.data:
@@ -390,28 +1486,370 @@ A destra puoi inserire funzioni future (diff, preset, ecc.)"""
         )
         if not path:
             return
+        old_path = self.file_path
+        self._flush_journal()
         self.file_path = path
-        self.on_save()
+        if self.active_doc is not None:
+            self.tabs.tab(self.active_doc, text=os.path.basename(path))
+        if self.on_save() and old_path and old_path != path:
+            self._discard_journal(old_path)
+
+    # -------------- Schede ---------------
+    def _blank_doc(self) -> Dict[str, Any]:
+        return {
+            "file_path": None, "data": None, "property_items": [],
+            "domain_types": [], "domain_units": [], "domain_trig_types": [],
+            "domain_trig_modes": [], "domain_change_masks": [],
+            "rows_all": [], "rows_base": [], "row_to_path": [], "path_index": {},
+            "summary": GroupSummary(), "path_tree": PathTree(), "issues": [],
+            "_file_sig": None, "conflict_paths": set(), "_scope_prefix": None, "_scope_paths": None,
+            "_group_filter": None, "_raw_text": None, "_spans": None, "_meta_spans": {},
+            "_last_sort_col": None, "_last_sort_asc": True,
+            "sort_dir_by_col": {c: True for c in range(len(HEADERS))},
+            "meta": ("", ""), "filters": {}, "used": 0,
+        }
+
+    def _load_doc_state(self, doc: Dict[str, Any]):
+        for attr in DOC_ATTRS:
+            setattr(self, attr, doc[attr])
+        self.var_name.set(doc["meta"][0])
+        self.var_instance.set(doc["meta"][1])
+
+    def _stash_active(self):
+        """Salva nel dict della scheda attiva lo stato corrente dell'editor."""
+        if self.active_doc is None:
+            return
+        self._sync_view_to_all()
+        self._journal_meta_changes()
+        doc = self.docs[self.active_doc]
+        for attr in DOC_ATTRS:
+            doc[attr] = getattr(self, attr)
+        doc["meta"] = (self.var_name.get(), self.var_instance.get())
+        doc["filters"] = self._filter_values()
+
+    def _touch_doc(self, k: int):
+        self._use_counter += 1
+        self.docs[k]["used"] = self._use_counter
+
+    def _on_tab_changed(self, _event=None):
+        try:
+            k = self.tabs.index("current")
+        except tk.TclError:
+            return
+        if k < len(self.docs):
+            self._activate_doc(k)
+
+    def _activate_doc(self, k: int):
+        if k == self.active_doc:
+            return
+        self._stash_active()
+        doc = self.docs[k]
+        if "cache" in doc:
+            self._restore_doc(doc)
+        else:
+            self._load_doc_state(doc)
+        self.active_doc = k
+        self._touch_doc(k)
+        self._refresh_doc_ui(doc["filters"])
+        self._enforce_doc_budget()
+        self.status.set(f"Attivo: {os.path.basename(self.file_path or '')}")
+
+    def _refresh_doc_ui(self, filters: Dict[str, str]):
+        self._reset_path_view()
+        self._refresh_filter_widgets()
+        for name, value in filters.items():
+            self._set_filter_value(name, value)
+        for col in self.sort_buttons:
+            self._update_sort_button_label(col)
+        self.apply_filters()
+        self._refresh_summary()
+        self._refresh_issues_view()
+        self._set_doc_buttons(tk.NORMAL if self.data else tk.DISABLED)
+
+    def _evict_doc(self, k: int):
+        """Scarica una scheda inattiva: restano solo le righe modificate e la cache compressa del documento."""
+        doc = self.docs[k]
+        rows_all, rows_base, paths = doc["rows_all"], doc["rows_base"], doc["row_to_path"]
+        doc["dirty"] = {paths[i]: rows_all[i] for i in range(len(rows_all)) if rows_all[i] != rows_base[i]}
+        # se il testo del file copre tutte le righe basta comprimere quello: resta possibile il salvataggio a patch
+        spans = doc["_spans"]
+        doc["cache_is_text"] = doc["_raw_text"] is not None and spans is not None and len(spans) == len(paths)
+        cached = doc["_raw_text"] if doc["cache_is_text"] else json.dumps(doc["data"], ensure_ascii=False)
+        doc["cache"] = zlib.compress(cached.encode("utf-8"), 1)
+        for attr in DOC_HEAVY_ATTRS:
+            doc.pop(attr, None)
+
+    def _restore_doc(self, doc: Dict[str, Any]):
+        """Ricostruisce una scheda scaricata dalla cache e vi riapplica le modifiche non salvate."""
+        state = self._blank_doc()
+        state.update(doc)
+        self._load_doc_state(state)
+        text = zlib.decompress(doc.pop("cache")).decode("utf-8")
+        if doc.pop("cache_is_text", False):
+            self.data, self._spans, self._meta_spans = scan_mapping(text)
+            self._raw_text = text
+        else:
+            self.data = json.loads(text)
+        self._load_properties()
+        for path, row in doc.pop("dirty").items():
+            i = self.path_index.get(path)
+            if i is not None:
+                self._set_row(i, row)
+
+    def _enforce_doc_budget(self):
+        """Scarica le schede inattive usate meno di recente finché le righe residenti superano il budget."""
+        resident = [k for k, d in enumerate(self.docs) if k != self.active_doc and "cache" not in d]
+        total = len(self.rows_all) + sum(len(self.docs[k]["rows_all"]) for k in resident)
+        for k in sorted(resident, key=lambda k: self.docs[k]["used"]):
+            if total <= DOC_ROWS_BUDGET:
+                break
+            total -= len(self.docs[k]["rows_all"])
+            self._evict_doc(k)
+
+    def on_close_tab(self):
+        if self.active_doc is None:
+            return
+        self._sync_view_to_all()
+        dirty = any(r != b for r, b in zip(self.rows_all, self.rows_base))
+        if dirty and not messagebox.askyesno(APP_TITLE, "Ci sono modifiche non salvate. Chiudere comunque?"):
+            return
+        k = self.active_doc
+        if self.file_path:
+            self._discard_journal(self.file_path)
+        self.docs.pop(k)
+        self.active_doc = None
+        self.tabs.forget(k)
+        if self.docs:
+            k = min(k, len(self.docs) - 1)
+            self.tabs.select(k)
+            self._activate_doc(k)
+        else:
+            self._load_doc_state(self._blank_doc())
+            self._refresh_doc_ui({})
+            self.status.set("Apri un file JSON di mapping…")
+
+    def on_quit(self):
+        """Chiusura normale: chiede conferma se ci sono modifiche non salvate, poi elimina i journal."""
+        self._stash_active()
+        self._flush_journal()
+        files = [self.file_path if k == self.active_doc else d.get("file_path") for k, d in enumerate(self.docs)]
+        unsaved = [fp for fp in files if fp and os.path.exists(journal_path(fp))]
+        if unsaved and not messagebox.askyesno(APP_TITLE, """Ci sono modifiche non salvate in:
+{}
+Uscire comunque?""".format("\n".join(os.path.basename(fp) for fp in unsaved))):
+            return
+        for fp in unsaved:
+            self._discard_journal(fp)
+        self.winfo_toplevel().destroy()
+
+    # -------------- Journal ---------------
+    def _meta_from_data(self) -> Tuple[str, str]:
+        if not self.data:
+            return ("", "")
+        return (str(self.data.get("name", "")), str(mapping_root(self.data).get("instanceOf", "")))
+
+    def _journal_append(self, entry: Dict[str, Any]):
+        if not self.file_path:
+            return
+        self._journal_buf.setdefault(self.file_path, []).append(_journal_line(entry))
+        self._schedule_journal_flush()
+
+    def _schedule_journal_flush(self):
+        if self._journal_job is None:
+            self._journal_job = self.after(JOURNAL_FLUSH_MS, self._flush_journal)
+
+    def _journal_row(self, i: int, old: List[Any], new: List[Any]):
+        path = self.row_to_path[i]
+        for col, (a, b) in enumerate(zip(old, new)):
+            if a != b:
+                self._journal_append({"p": path, "f": HEADERS[col], "v": b})
+
+    def _journal_meta_changes(self):
+        if not (self.file_path and self.data):
+            return
+        cur = (self.var_name.get(), self.var_instance.get())
+        last = self._journal_meta.get(self.file_path, self._meta_from_data())
+        for key, a, b in zip(("name", "instanceOf"), last, cur):
+            if a != b:
+                self._journal_append({"m": key, "v": b})
+        self._journal_meta[self.file_path] = cur
+
+    def _flush_journal(self):
+        """Accoda su disco le modifiche in attesa (append + fsync, nessuna riscrittura del mapping)."""
+        if self._journal_job is not None:
+            try:
+                self.after_cancel(self._journal_job)
+            except Exception:
+                pass
+            self._journal_job = None
+        self._journal_meta_changes()
+        for fp, lines in list(self._journal_buf.items()):
+            if not lines:
+                continue
+            jpath = journal_path(fp)
+            try:
+                with open(jpath, "a", encoding="utf-8") as f:
+                    f.writelines(lines)
+                    f.flush()
+                    os.fsync(f.fileno())
+                lines.clear()
+                if os.path.getsize(jpath) > JOURNAL_COMPACT_BYTES:
+                    compact_journal(jpath)
+            except OSError as e:
+                self.status.set(f"Journal non scrivibile ({os.path.basename(jpath)}): {e}")
+
+    def _discard_journal(self, file_path: str):
+        self._journal_buf.pop(file_path, None)
+        try:
+            os.remove(journal_path(file_path))
+        except OSError:
+            pass
+
+    def _recover_journal(self):
+        """Se esiste un journal (sessione terminata senza salvare) propone di riapplicarlo."""
+        jpath = journal_path(self.file_path)
+        if not os.path.exists(jpath):
+            return
+        cells, meta = read_journal(jpath)
+        if not cells and not meta:
+            self._discard_journal(self.file_path)
+            return
+        if not messagebox.askyesno(APP_TITLE, f"""Trovate {len(cells) + len(meta)} modifiche non salvate
+di una sessione precedente per {os.path.basename(self.file_path)}.
+Ripristinarle?"""):
+            self._discard_journal(self.file_path)
+            return
+
+        touched: Dict[int, List[Any]] = {}
+        for (path, field), value in cells.items():
+            i = self.path_index.get(path)
+            col = IDX.get(field)
+            if i is None or col is None:
+                continue
+            row = touched.setdefault(i, list(self.rows_all[i]))
+            row[col] = value
+        for i, row in touched.items():
+            self._set_row(i, row)
+        # valori già nel journal: registrarli prima, così la trace non li riaccoda
+        name, inst = self._journal_meta.get(self.file_path, self._meta_from_data())
+        self._journal_meta[self.file_path] = (meta.get("name", name), meta.get("instanceOf", inst))
+        if "name" in meta:
+            self.var_name.set(meta["name"])
+        if "instanceOf" in meta:
+            self.var_instance.set(meta["instanceOf"])
+        compact_journal(jpath)
+        self._patch_view(list(touched))
+        self.status.set(f"Ripristinate {len(cells) + len(meta)} modifiche non salvate")
+
+    # -------------- CSV ---------------
+    def on_export_csv(self):
+        if not self.data:
+            return
+        base = os.path.splitext(os.path.basename(self.file_path or "mapping"))[0]
+        path = filedialog.asksaveasfilename(
+            title="Esporta vista in CSV",
+            defaultextension=".csv",
+            initialfile=f"{base}.csv",
+            filetypes=[("File CSV", "*.csv")]
+        )
+        if not path:
+            return
+        try:
+            self._sync_view_to_all()
+            n = export_csv(path, (self.row_to_path[i] for i in self.view_index_map), self.rows_view)
+            self.status.set(f"Esportate {n} righe in {os.path.basename(path)}")
+        except Exception as e:
+            messagebox.showerror(APP_TITLE, f"""Errore esportazione CSV:
+{e}""")
+
+    def on_import_csv(self):
+        if not self.data:
+            return
+        path = filedialog.askopenfilename(
+            title="Importa CSV",
+            filetypes=[("File CSV", "*.csv"), ("Tutti i file", "*.*")]
+        )
+        if not path:
+            return
+        try:
+            n_updated, errors = self.import_csv(path)
+        except Exception as e:
+            messagebox.showerror(APP_TITLE, f"""Errore importazione CSV:
+{e}""")
+            return
+        self.status.set(f"Importate {n_updated} righe da {os.path.basename(path)}"
+                        + (f" — {len(errors)} scartate" if errors else ""))
+        if errors:
+            preview = "\n".join(errors[:30])
+            more = "\n…" if len(errors) > 30 else ""
+            messagebox.showwarning(APP_TITLE, f"""Righe non importate:
+{preview}{more}""")
+
+    def import_csv(self, csv_path: str) -> Tuple[int, List[str]]:
+        """Unisce il CSV alla tabella per path; le righe non valide vengono scartate.
+
+        Solo le celle con valore diverso vengono toccate, e ogni riga modificata passa
+        dalle stesse regole del salvataggio (row_to_property) prima di essere accettata.
+        """
+        self._sync_view_to_all()
+        errors: List[str] = []
+        touched: List[int] = []
+        for line_no, path, vals in iter_csv_rows(csv_path):
+            i = self.path_index.get(path)
+            if i is None:
+                errors.append(f"riga {line_no}: path sconosciuto '{path}'")
+                continue
+            new_row = list(self.rows_all[i])
+            changed = False
+            for col, val in vals:
+                if str(new_row[col]) != val:
+                    new_row[col] = val
+                    changed = True
+            if not changed:
+                continue
+            row_errors: List[str] = []
+            row_to_property({}, new_row, path, row_errors)
+            if row_errors:
+                errors.extend(f"riga {line_no}: {e}" for e in row_errors)
+                continue
+            self._journal_row(i, self.rows_all[i], new_row)
+            self._set_row(i, new_row)
+            touched.append(i)
+        if touched:
+            self._patch_view(touched)
+        return len(touched), errors
 
     # -------------- Index & domains ---------------
     def _reindex(self):
         self.property_items.clear()
         if not self.data:
             return
-        root = self.data.get("json") if isinstance(self.data, dict) else None
-        if not root:
-            root = self.data
+        root = mapping_root(self.data)
 
         # Precompila META
         self.var_name.set(str(self.data.get("name", "")))
-        self.var_instance.set(str((root or {}).get("instanceOf", "")))
+        self.var_instance.set(str(root.get("instanceOf", "")))
+
+        self._load_properties()
+        self._scope_prefix = None
+        self._scope_paths = None
+        self.issues = []
+        self._refresh_issues_view()
+        self._reset_path_view()
+        self._refresh_filter_widgets()
+        self.apply_filters()
+        self._refresh_summary()
 
-        props = (root or {}).get("properties", {})
+    def _load_properties(self):
+        self.property_items.clear()
+        props = mapping_root(self.data).get("properties", {})
         for path, obj in props.items():
             if isinstance(obj, dict):
                 self.property_items.append((path, obj))
+        self._compute_domains()
+        self._build_rows_all()
 
-        # Domini
+    def _compute_domains(self):
         def collect_top(key: str) -> List[str]:
             vals: List[str] = []
             for _, o in self.property_items:
@@ -435,46 +1873,29 @@ A destra puoi inserire funzioni future (diff, preset, ecc.)"""
         self.domain_trig_modes = collect_trig("mode")
         self.domain_change_masks = collect_trig("changeMask") or [""]
 
-        self._build_rows_all()
-        self._refresh_filter_widgets()
-        self.apply_filters()
-
     def _build_rows_all(self):
+        self.summary.clear()
         self.rows_all.clear()
+        self.rows_base.clear()
         self.row_to_path.clear()
+        self.path_index.clear()
         for path, obj in self.property_items:
-            tr = (obj.get("sendPolicy", {}).get("triggers", []) or [{}])[0]
-            db_val: Optional[float] = None
-            db_type = ""
-            if "deadbandPercent" in tr and tr.get("deadbandPercent") is not None:
-                db_val = tr.get("deadbandPercent")
-                db_type = "PERC"
-            elif "deadband" in tr and tr.get("deadband") is not None:
-                db_val = tr.get("deadband")
-                db_type = "ABS"
-
-            row = [
-                obj.get("type", ""),
-                obj.get("label", ""),
-                obj.get("unit", ""),
-                tr.get("type", ""),
-                tr.get("level", ""),
-                tr.get("mode", ""),
-                tr.get("minIntervalMs", ""),
-                tr.get("skipFirstNChanges", ""),
-                tr.get("changeMask", ""),
-                "" if db_val is None else db_val,
-                db_type,
-            ]
+            row = property_to_row(obj)
+            path = _intern(path)
+            self.path_index[path] = len(self.rows_all)
             self.rows_all.append(row)
+            self.rows_base.append(list(row))
             self.row_to_path.append(path)
+            self.summary.add(row)
+        self.path_tree.build(self.row_to_path)
 
-    def _refresh_filter_widgets(self):
+    def _refresh_filter_widgets(self, keep_selection: bool = False):
         def set_combo(name: str, values: List[str]):
             w = self._find_filter_widget(name)
             if isinstance(w, ttk.Combobox):
                 w["values"] = [""] + values
-                w.set("")
+                if not keep_selection:
+                    w.set("")
         set_combo("type", self.domain_types)
         set_combo("unit", self.domain_units)
         set_combo("trigger type", self.domain_trig_types)
@@ -496,6 +1917,56 @@ A destra puoi inserire funzioni future (diff, preset, ecc.)"""
 
     # -------------- Filtering ---------------
     def apply_filters(self):
+        fv, group = self._active_filters()
+        scope = self._scope_rows()
+
+        self.rows_view.clear()
+        self.view_index_map.clear()
+        for i in (range(len(self.rows_all)) if scope is None else scope):
+            row = self.rows_all[i]
+            if self._row_matches(row, fv, group):
+                self.rows_view.append(list(row))
+                self.view_index_map.append(i)
+
+        self.sheet.set_sheet_data(self.rows_view, reset_col_positions=True, reset_row_positions=True)
+        self._refresh_headers_with_arrow()
+        if self._last_sort_col is not None:
+            self._sort_view_by(self._last_sort_col, self._last_sort_asc)
+        else:
+            self._refresh_highlights()
+
+    def _scope_rows(self) -> Optional[List[int]]:
+        """Righe a cui è ristretta la vista (None = tutte)."""
+        if self._scope_paths is not None:
+            return sorted(self.path_index[p] for p in self._scope_paths if p in self.path_index)
+        if self._scope_prefix is None:
+            return None
+        return self.path_tree.rows_under(self._scope_prefix)
+
+    def _filter_values(self) -> Dict[str, str]:
+        return {h: self._get_filter_value(h) for h in HEADERS}
+
+    def _active_filters(self) -> Tuple[Dict[str, str], Optional[Tuple[int, str]]]:
+        """Filtri per colonna e gruppo del riepilogo (indice colonna, valore) se ancora attivo.
+
+        Il gruppo vale finché il filtro della sua colonna mostra quel valore: in quel caso
+        sostituisce il filtro della colonna, confrontando come GroupSummary (str(v).strip()).
+        """
+        fv = self._filter_values()
+        if self._group_filter is None:
+            return fv, None
+        key, gval = self._group_filter
+        if fv.get(key, "").strip() != gval:
+            self._group_filter = None
+            return fv, None
+        fv[key] = ""
+        return fv, (IDX[key], gval)
+
+    @staticmethod
+    def _row_matches(row: List[Any], fv: Dict[str, str], group: Optional[Tuple[int, str]] = None) -> bool:
+        if group is not None and str(row[group[0]]).strip() != group[1]:
+            return False
+
         def match_text(val: Any, query: str) -> bool:
             q = (query or "").strip()
             if q == "":
@@ -521,31 +1992,15 @@ A destra puoi inserire funzioni future (diff, preset, ecc.)"""
                         return v == num
             return ql in s
 
-        fv = {h: self._get_filter_value(h) for h in HEADERS}
-
-        self.rows_view.clear()
-        self.view_index_map.clear()
-        for i, row in enumerate(self.rows_all):
-            ok = True
-            if not match_text(row[IDX["type"]], fv["type"]): ok = False
-            if not match_text(row[IDX["label"]], fv["label"]): ok = False
-            if fv["unit"] and row[IDX["unit"]] != fv["unit"]: ok = False
-            if fv["trigger type"] and row[IDX["trigger type"]] != fv["trigger type"]: ok = False
-            if not match_text(row[IDX["level"]], fv["level"]): ok = False
-            if fv["mode"] and row[IDX["mode"]] != fv["mode"]: ok = False
-            if not match_text(row[IDX["min interval ms"]], fv["min interval ms"]): ok = False
-            if not match_text(row[IDX["skip first n changes"]], fv["skip first n changes"]): ok = False
-            if fv["change mask"] and row[IDX["change mask"]] != fv["change mask"]: ok = False
-            if not match_text(row[IDX["deadband"]], fv["deadband"]): ok = False
-            if fv["deadband type"] and row[IDX["deadband type"]] != fv["deadband type"]: ok = False
-            if ok:
-                self.rows_view.append(list(row))
-                self.view_index_map.append(i)
-
-        self.sheet.set_sheet_data(self.rows_view, reset_col_positions=True, reset_row_positions=True)
-        self._refresh_headers_with_arrow()
-        if self._last_sort_col is not None:
-            self._sort_view_by(self._last_sort_col, self._last_sort_asc)
+        for i, col in enumerate(COLUMNS):
+            q = fv.get(col.header)
+            if not q:
+                continue
+            if col.exact:
+                if row[i] != q: return False
+            elif not match_text(row[i], q):
+                return False
+        return True
 
     def _get_filter_value(self, name: str) -> str:
         w = self._find_filter_widget(name)
@@ -587,6 +2042,7 @@ A destra puoi inserire funzioni future (diff, preset, ecc.)"""
         self.view_index_map = [i for _, i in pairs]
         self.sheet.set_sheet_data(self.rows_view, reset_col_positions=False, reset_row_positions=True)
         self._refresh_headers_with_arrow()
+        self._refresh_highlights()
 
     # -------------- In-cell editing helpers ---------------
     def _on_begin_edit_cell(self, _event=None):
@@ -650,6 +2106,8 @@ A destra puoi inserire funzioni future (diff, preset, ecc.)"""
                     self.sheet.set_cell_data(row, col, "")
             else:
                 self.sheet.set_cell_data(row, col, val)
+            if self._sync_view_row(row):
+                self._refresh_summary()
 
     def _open_deadband_combo(self, row: int, col: int):
         if self._overlay_combo is not None:
@@ -685,6 +2143,8 @@ A destra puoi inserire funzioni future (diff, preset, ecc.)"""
             return
         self.sheet.set_cell_data(row, col, val)
         self._destroy_overlay_combo()
+        if self._sync_view_row(row):
+            self._refresh_summary()
 
     def _destroy_overlay_combo(self):
         if self._overlay_combo is not None:
@@ -695,18 +2155,415 @@ A destra puoi inserire funzioni future (diff, preset, ecc.)"""
         self._overlay_combo = None
         self._overlay_cell = None
 
+    # -------------- Albero percorsi ---------------
+    def _reset_path_view(self):
+        view = getattr(self, "path_view", None)
+        if view is None:
+            return
+        view.delete(*view.get_children())
+        self._tree_nodes = {"": ()}
+        self._fill_tree_node("", ())
+
+    def _fill_tree_node(self, iid: str, prefix: Tuple[str, ...]):
+        view = self.path_view
+        view.delete(*view.get_children(iid))
+        children, omitted = self.path_tree.children(prefix)
+        for seg, count, has_children in children:
+            child = view.insert(iid, tk.END, text=seg, values=(count,))
+            self._tree_nodes[child] = prefix + (seg,)
+            if has_children:
+                view.insert(child, tk.END, text="…")   # segnaposto: figli caricati all'apertura
+        if omitted:
+            view.insert(iid, tk.END, text=f"… altre {omitted} property", values=("",))
+
+    def _on_tree_open(self, _event=None):
+        iid = self.path_view.focus()
+        prefix = self._tree_nodes.get(iid)
+        if prefix is None:
+            return
+        kids = self.path_view.get_children(iid)
+        if len(kids) == 1 and kids[0] not in self._tree_nodes:
+            self._fill_tree_node(iid, prefix)
+
+    def _on_tree_select(self, _event=None):
+        sel = self.path_view.selection()
+        if not sel or sel[0] not in self._tree_nodes:
+            return
+        self._scope_prefix = self._tree_nodes[sel[0]]
+        self._scope_paths = None
+        self.apply_filters()
+        self.status.set(f"Vista: {self.path_tree.join(self._scope_prefix)} "
+                        f"({self.path_tree.count(self._scope_prefix)} property)")
+
+    def _clear_scope(self):
+        if self._scope_prefix is None and self._scope_paths is None:
+            return
+        self._scope_prefix = None
+        self._scope_paths = None
+        for view in (self.path_view, self.issues_tree):
+            try:
+                view.selection_remove(*view.selection())
+            except Exception:
+                pass
+        self.apply_filters()
+
+    # -------------- Problemi (duplicati / conflitti) ---------------
+    def _current_items(self) -> Iterator[Tuple[str, Dict[str, Any]]]:
+        """property_items con le modifiche non salvate della tabella applicate (su copia)."""
+        self._sync_view_to_all()
+        for i, (path, obj) in enumerate(self.property_items):
+            if self.rows_all[i] != self.rows_base[i]:
+                obj = copy.deepcopy(obj)
+                row_to_property(obj, self.rows_all[i], path, [], self.rows_base[i])
+            yield path, obj
+
+    def on_check_issues(self):
+        if not self.data:
+            return
+        self.issues = find_issues(self._current_items())
+        self._refresh_issues_view()
+        self.status.set(f"Controllo: {len(self.issues)} problemi" if self.issues else "Controllo: nessun problema")
+
+    def _refresh_issues_view(self):
+        tree = getattr(self, "issues_tree", None)
+        if tree is None:
+            return
+        tree.delete(*tree.get_children())
+        want = self.var_issue_kind.get()
+        for n, (kind, key, paths) in enumerate(self.issues):
+            if want != "tutti" and ISSUE_KINDS[kind] != want:
+                continue
+            tree.insert("", tk.END, iid=str(n), text=key, values=(ISSUE_KINDS[kind], len(paths)))
+
+    def _on_issue_select(self, _event=None):
+        sel = self.issues_tree.selection()
+        if not sel:
+            return
+        kind, key, paths = self.issues[int(sel[0])]
+        self._scope_paths = paths
+        self._scope_prefix = None
+        self.apply_filters()
+        self.status.set(f"Vista: {ISSUE_KINDS[kind]} '{key}' ({len(paths)} property)")
+
+    # -------------- Riepilogo per gruppo ---------------
+    def _refresh_summary(self):
+        tree = getattr(self, "summary_tree", None)
+        if tree is None:
+            return
+
+        def fmt(agg: Optional[Tuple[float, float, float]]) -> str:
+            if agg is None:
+                return ""
+            return " / ".join(f"{v:.6g}" for v in agg)
+
+        tree.delete(*tree.get_children())
+        for gval, count, agg in self.summary.rows(self.var_summary_key.get(), self.rows_all):
+            tree.insert("", tk.END, iid=f"g:{gval}", text=gval or "(vuoto)",
+                        values=(count, fmt(agg["min interval ms"]), fmt(agg["deadband"])))
+
+    def _on_summary_select(self, _event=None):
+        sel = self.summary_tree.selection()
+        if not sel:
+            return
+        gval = sel[0][2:]
+        if gval == "":
+            self.status.set("Il filtro su valore vuoto non è supportato")
+            return
+        key = self.var_summary_key.get()
+        self._group_filter = (key, gval)
+        self._set_filter_value(key, gval)
+        self.apply_filters()
+
+    def _set_filter_value(self, name: str, value: str):
+        w = self._find_filter_widget(name)
+        if isinstance(w, ttk.Combobox):
+            w.set(value)
+        elif isinstance(w, ttk.Entry):
+            w.delete(0, tk.END)
+            w.insert(0, value)
+
+    # -------------- Osservazione file (ricarica incrementale) ---------------
+    def _on_toggle_watch(self):
+        if self._watch_job is not None:
+            try:
+                self.after_cancel(self._watch_job)
+            except Exception:
+                pass
+            self._watch_job = None
+        if self.var_watch.get():
+            self._watch_job = self.after(WATCH_INTERVAL_MS, self._watch_tick)
+
+    def _watch_tick(self):
+        self._watch_job = None
+        try:
+            if self.file_path and self.data:
+                sig = file_signature(self.file_path)
+                if sig is not None and sig != self._file_sig:
+                    self._reload_external()
+        finally:
+            if self.var_watch.get():
+                self._watch_job = self.after(WATCH_INTERVAL_MS, self._watch_tick)
+
+    def _reload_external(self):
+        sig = file_signature(self.file_path)
+        try:
+            new_data, text, spans, meta_spans = read_mapping(self.file_path)
+        except (OSError, ValueError):
+            # file in scrittura dal tool esterno: riprova al prossimo giro
+            return
+        if not isinstance(new_data, dict):
+            return
+        self._file_sig = sig
+        n_changed, n_added, n_removed, conflicts = self._merge_external(new_data)
+        self._raw_text, self._spans, self._meta_spans = text, spans, meta_spans
+        msg = (f"Ricaricato da disco: {n_changed} modificate, {n_added} aggiunte, "
+               f"{n_removed} rimosse")
+        if conflicts:
+            msg += f" — {len(conflicts)} conflitti (modifiche locali mantenute)"
+        self.status.set(msg)
+        if conflicts:
+            preview = "\n".join(conflicts[:20])
+            more = "\n…" if len(conflicts) > 20 else ""
+            messagebox.showwarning(APP_TITLE, f"""Il file è stato modificato esternamente.
+Nelle seguenti property gli stessi campi sono stati modificati anche localmente (valori locali mantenuti):
+{preview}{more}""")
+
+    def _merge_external(self, new_data: Dict[str, Any]) -> Tuple[int, int, int, List[str]]:
+        """Confronta per path il nuovo documento con quello in memoria e aggiorna solo le righe cambiate.
+
+        Nelle righe con modifiche locali non salvate le celle modificate restano quelle locali,
+        le altre prendono il valore del file; se una cella è cambiata da entrambe le parti
+        la riga è segnata come conflitto.
+        """
+        self._sync_view_to_all()
+
+        root = mapping_root(self.data)
+        props = root.setdefault("properties", {})
+        new_root = mapping_root(new_data)
+        new_props = new_root.get("properties", {}) or {}
+
+        touched: List[int] = []
+        conflicts: List[str] = []
+        n_changed = 0
+
+        # property modificate / aggiunte
+        added: List[Tuple[str, Dict[str, Any]]] = []
+        for path, obj in new_props.items():
+            if not isinstance(obj, dict):
+                continue
+            i = self.path_index.get(path)
+            if i is None:
+                added.append((path, obj))
+                continue
+            if props.get(path) == obj:
+                continue
+            n_changed += 1
+            props[path] = obj
+            self.property_items[i] = (path, obj)
+            new_row = property_to_row(obj)
+            local, base = self.rows_all[i], self.rows_base[i]
+            if local != base:
+                # fusione a tre vie per cella: le celle non toccate localmente prendono il valore
+                # del file, conflitto solo dove entrambi hanno cambiato (in modo diverso)
+                merged = [n if l == b else l for l, b, n in zip(local, base, new_row)]
+                if any(l != b and n != b and n != l for l, b, n in zip(local, base, new_row)):
+                    conflicts.append(path)
+                    self.conflict_paths.add(path)
+            else:
+                merged = new_row
+            if merged != local:
+                self._set_row(i, merged)
+                touched.append(i)
+            self.rows_base[i] = list(new_row)
+
+        # property rimosse (quelle con modifiche locali restano, in conflitto)
+        removed = set()
+        for path, i in self.path_index.items():
+            if path in new_props and isinstance(new_props[path], dict):
+                continue
+            if self.rows_all[i] != self.rows_base[i]:
+                conflicts.append(path)
+                self.conflict_paths.add(path)
+            else:
+                removed.add(i)
+        if removed:
+            remap = self._drop_rows(removed)
+            touched = [remap[i] for i in touched]
+
+        for path, obj in added:
+            props[path] = obj
+            row = property_to_row(obj)
+            i = len(self.rows_all)
+            self.path_index[path] = i
+            self.property_items.append((path, obj))
+            self.rows_all.append(row)
+            self.rows_base.append(list(row))
+            self.row_to_path.append(path)
+            self.summary.add(row)
+            touched.append(i)
+        if removed or added:
+            # una ricostruzione (ordinamento in C) costa meno di tanti inserimenti O(n) nelle liste
+            self.path_tree.build(self.row_to_path)
+
+        # resto del documento (meta, chiavi non tabellari) dal file, properties già allineate
+        old_name = str(self.data.get("name", ""))
+        old_inst = str(root.get("instanceOf", ""))
+        new_root["properties"] = props
+        self.data = new_data
+        # i campi non modificati localmente seguono il file: aggiornare prima il meta già
+        # registrato, così il journal non li scambia per modifiche
+        new_name, new_inst = self._meta_from_data()
+        jname, jinst = self._journal_meta.get(self.file_path, (old_name, old_inst))
+        if self.var_name.get() == old_name:
+            jname = new_name
+        if self.var_instance.get() == old_inst:
+            jinst = new_inst
+        self._journal_meta[self.file_path] = (jname, jinst)
+        if self.var_name.get() == old_name:
+            self.var_name.set(new_name)
+        if self.var_instance.get() == old_inst:
+            self.var_instance.set(new_inst)
+
+        self._compute_domains()
+        self._refresh_filter_widgets(keep_selection=True)
+        if removed or added:
+            self._reset_path_view()
+        self._patch_view(touched)
+        return n_changed, len(added), len(removed), conflicts
+
+    def _drop_rows(self, removed: set) -> List[int]:
+        """Elimina le righe indicate; ritorna la mappa vecchio indice -> nuovo (-1 se rimossa)."""
+        props = mapping_root(self.data).get("properties", {})
+        remap: List[int] = []
+        keep: List[int] = []
+        for i in range(len(self.rows_all)):
+            if i in removed:
+                remap.append(-1)
+                props.pop(self.row_to_path[i], None)
+                self.summary.remove(self.rows_all[i])
+            else:
+                remap.append(len(keep))
+                keep.append(i)
+        self.rows_all = [self.rows_all[i] for i in keep]
+        self.rows_base = [self.rows_base[i] for i in keep]
+        self.row_to_path = [self.row_to_path[i] for i in keep]
+        self.property_items = [self.property_items[i] for i in keep]
+        self.path_index = {p: i for i, p in enumerate(self.row_to_path)}
+
+        pairs = [(r, remap[i]) for r, i in zip(self.rows_view, self.view_index_map) if remap[i] >= 0]
+        self.rows_view = [r for r, _ in pairs]
+        self.view_index_map = [i for _, i in pairs]
+        return remap
+
+    def _patch_view(self, touched: List[int]):
+        """Aggiorna rows_view solo per le righe toccate, mantenendo filtri e ordinamento."""
+        fv, group = self._active_filters()
+        scope = self._scope_rows()
+        in_scope = None if scope is None else set(scope)
+        pos_of = {i: pos for pos, i in enumerate(self.view_index_map)}
+        gone = set()
+        for i in touched:
+            row = self.rows_all[i]
+            pos = pos_of.get(i)
+            if (in_scope is None or i in in_scope) and self._row_matches(row, fv, group):
+                if pos is None:
+                    self.rows_view.append(list(row))
+                    self.view_index_map.append(i)
+                else:
+                    self.rows_view[pos] = list(row)
+            elif pos is not None:
+                gone.add(pos)
+        if gone:
+            pairs = [(r, i) for pos, (r, i) in enumerate(zip(self.rows_view, self.view_index_map))
+                     if pos not in gone]
+            self.rows_view = [r for r, _ in pairs]
+            self.view_index_map = [i for _, i in pairs]
+
+        if self._last_sort_col is not None:
+            self._sort_view_by(self._last_sort_col, self._last_sort_asc)
+        else:
+            # le righe possono essere aumentate/diminuite: tksheet ricalcola le posizioni solo con
+            # reset_row_positions, lo scroll si ripristina a mano
+            try:
+                top = self.sheet.get_yview()[0]
+            except Exception:
+                top = None
+            self.sheet.set_sheet_data(self.rows_view, reset_col_positions=False, reset_row_positions=True)
+            if top is not None:
+                try:
+                    self.sheet.set_yview(top)
+                except Exception:
+                    pass
+            self._refresh_headers_with_arrow()
+            self._refresh_highlights()
+        self._refresh_summary()
+
+    def _refresh_highlights(self):
+        """Evidenzia le righe in conflitto con il file su disco."""
+        try:
+            self.sheet.dehighlight_rows("all", redraw=False)
+            rows = [pos for pos, i in enumerate(self.view_index_map)
+                    if self.row_to_path[i] in self.conflict_paths]
+            if rows:
+                self.sheet.highlight_rows(rows, bg="#ffd7d7", redraw=False)
+            self.sheet.redraw()
+        except Exception:
+            pass
+
     # -------------- Commit ---------------
-    def _commit_table_to_json(self):
+    def _set_row(self, i: int, row: List[Any]):
+        """Sostituisce rows_all[i] tenendo allineato il riepilogo."""
+        self.summary.remove(self.rows_all[i])
+        self.rows_all[i] = row
+        self.summary.add(row)
+
+    def _sync_view_row(self, idx_view: int, row_vals: Optional[List[Any]] = None) -> bool:
+        """Riporta in rows_all una riga della vista; True se era cambiata."""
+        if row_vals is None:
+            try:
+                row_vals = list(self.sheet.get_row_data(idx_view))
+            except Exception:
+                return False
+        if idx_view >= len(self.view_index_map):
+            return False   # riga aggiunta dalla tabella oltre la vista: non corrisponde a una property
+        idx_all = self.view_index_map[idx_view]
+        if row_vals == self.rows_all[idx_all]:
+            return False
+        self._journal_row(idx_all, self.rows_all[idx_all], row_vals)
+        self._set_row(idx_all, row_vals)
+        return True
+
+    def _sync_view_to_all(self):
+        """Riporta in rows_all le modifiche fatte in tabella (solo righe visibili)."""
+        changed = False
+        for idx_view, row_vals in enumerate(self.sheet.get_sheet_data()):
+            changed = self._sync_view_row(idx_view, list(row_vals)) or changed
+        if changed:
+            self._refresh_summary()
+
+    def _on_sheet_modified(self, event=None):
+        rows = set()
+        try:
+            rows = {rc[0] for rc in event["cells"]["table"]}
+        except Exception:
+            pass
+        if not rows:
+            self._sync_view_to_all()
+            return
+        changed = False
+        for r in rows:
+            changed = self._sync_view_row(r) or changed
+        if changed:
+            self._refresh_summary()
+
+    def _commit_table_to_json(self, only_dirty: bool = False):
+        """Riporta la tabella nel JSON; con `only_dirty` solo le righe diverse da quelle su disco."""
         if not self.data:
             return
 
-        # sincr. vista -> all (solo righe visibili)
-        current = [list(r) for r in self.sheet.get_sheet_data()]
-        for idx_view, row_vals in enumerate(current):
-            idx_all = self.view_index_map[idx_view]
-            self.rows_all[idx_all] = row_vals
+        self._sync_view_to_all()
 
-        root = self.data.get("json") or self.data
+        root = mapping_root(self.data)
 
         # commit meta
         nm = self.var_name.get().strip()
@@ -720,107 +2577,171 @@ A destra puoi inserire funzioni future (diff, preset, ecc.)"""
         errors: List[str] = []
 
         for i, row in enumerate(self.rows_all):
+            if only_dirty and row == self.rows_base[i]:
+                continue
             path = self.row_to_path[i]
             obj = props.get(path, {})
+            row_to_property(obj, row, path, errors, self.rows_base[i] if only_dirty else None)
+            props[path] = obj
 
-            obj_type = str(row[IDX["type"]]).strip()
-            obj_label = str(row[IDX["label"]]).strip()
-            obj_unit = str(row[IDX["unit"]]).strip()
-            if obj_type: obj["type"] = obj_type
-            if obj_label != "": obj["label"] = obj_label
-            if obj_unit != "": obj["unit"] = obj_unit
-            elif "unit" in obj:
-                obj.pop("unit", None)
-
-            tr_list = obj.setdefault("sendPolicy", {}).setdefault("triggers", [])
-            if not tr_list:
-                tr_list.append({})
-            tr = tr_list[0]
-
-            trig_type = str(row[IDX["trigger type"]]).strip()
-            level = row[IDX["level"]]
-            mode = str(row[IDX["mode"]]).strip()
-            minint = row[IDX["min interval ms"]]
-            skipn = row[IDX["skip first n changes"]]
-            cmask = str(row[IDX["change mask"]]).strip()
-            db = row[IDX["deadband"]]
-            dbt = str(row[IDX["deadband type"]]).strip().upper()
-
-            if trig_type: tr["type"] = trig_type
-            if mode != "": tr["mode"] = mode
-
-            # level (int)
-            try:
-                if str(level).strip() == "":
-                    tr.pop("level", None)
-                else:
-                    tr["level"] = int(level)
-            except Exception:
-                errors.append(f"{path}: 'level' non valido")
-
-            # min interval (>=0)
-            try:
-                if str(minint).strip() == "":
-                    tr.pop("minIntervalMs", None)
-                else:
-                    mi = int(minint)
-                    if mi < 0: raise ValueError
-                    tr["minIntervalMs"] = mi
-            except Exception:
-                errors.append(f"{path}: 'min interval ms' non valido (>=0)")
+        if errors:
+            raise ValueError("\n".join(errors))
 
-            # skip first n changes (>=0)
-            try:
-                if str(skipn).strip() == "":
-                    tr.pop("skipFirstNChanges", None)
-                else:
-                    sk = int(skipn)
-                    if sk < 0: raise ValueError
-                    tr["skipFirstNChanges"] = sk
-            except Exception:
-                errors.append(f"{path}: 'skip first n changes' non valido (>=0)")
+    def _patched_text(self) -> Optional[Tuple[str, Dict[str, Span], Dict[str, Span]]]:
+        """Testo del file con riscritte solo le property modificate (e il meta, se cambiato).
 
-            # change mask
-            if cmask == "":
-                tr.pop("changeMask", None)
-            else:
-                tr["changeMask"] = cmask
+        Ritorna (testo, nuovi span property, nuovi span meta), oppure None se una modifica
+        non ha uno span nel testo originale e serve il salvataggio completo.
+        """
+        text, spans = self._raw_text, self._spans
+        if text is None or spans is None or len(spans) != len(self.row_to_path):
+            return None
+        root = mapping_root(self.data)
+        props = root.get("properties", {})
 
-            # deadband + tipo
-            try:
-                if str(dbt) == "":
-                    tr.pop("deadband", None)
-                    tr.pop("deadbandPercent", None)
-                elif dbt == "ABS":
-                    if str(db).strip() == "":
-                        tr.pop("deadband", None)
-                        tr.pop("deadbandPercent", None)
-                    else:
-                        v = float(db)
-                        if v < 0: raise ValueError
-                        tr["deadband"] = v
-                        tr.pop("deadbandPercent", None)
-                elif dbt == "PERC":
-                    if str(db).strip() == "":
-                        tr.pop("deadband", None)
-                        tr.pop("deadbandPercent", None)
-                    else:
-                        v = float(db)
-                        if not (0.0 <= v <= 100.0): raise ValueError
-                        tr["deadbandPercent"] = v
-                        tr.pop("deadband", None)
-                else:
-                    errors.append(f"{path}: 'deadband type' deve essere ABS o PERC")
-            except Exception:
-                errors.append(f"{path}: 'deadband' non valido")
+        edits: List[Tuple[int, int, str]] = []
+        for i, row in enumerate(self.rows_all):
+            if row == self.rows_base[i]:
+                continue
+            span = spans.get(self.row_to_path[i])
+            if span is None:
+                return None
+            edits.append((span[0], span[1], dump_span(props[self.row_to_path[i]], text, *span)))
 
-            props[path] = obj
+        for key, holder in (("name", self.data), ("instanceOf", root)):
+            if key not in holder:
+                continue
+            span = self._meta_spans.get(key)
+            if span is None:
+                return None
+            if json.loads(text[span[0]:span[1]]) != holder[key]:
+                edits.append((span[0], span[1], json.dumps(holder[key], ensure_ascii=False)))
 
-        if errors:
-            raise ValueError("\n".join(errors))
+        return splice(text, edits), shift_spans(spans, edits), shift_spans(self._meta_spans, edits)
 
 # ---------------- main ----------------
-def main():
+def check_file(path: str) -> int:
+    """Controllo da riga di comando (CI): stampa i problemi, exit code 1 se ce ne sono, 2 se il file
+    non è leggibile."""
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+    except (OSError, ValueError) as e:
+        print(f"File non leggibile ({path}): {e}", file=sys.stderr)
+        return 2
+    props = mapping_root(data).get("properties", {}) or {}
+    items = [(p, o) for p, o in props.items() if isinstance(o, dict)]
+    issues = find_issues(items)
+    for kind, key, paths in issues:
+        print(f"{ISSUE_KINDS[kind]}: {key}")
+        for p in paths:
+            print(f"    {p}")
+    print(f"{len(issues)} problemi su {len(items)} property ({os.path.basename(path)})")
+    return 1 if issues else 0
+
+
+def _safe_segments(keys: List[Any]) -> Optional[List[str]]:
+    """Chiavi di FieldPath nel formato di safe_get/safe_set ('triggers[0]'); None se non esprimibili
+    (safe_get ammette un solo indice per segmento, es. non 'x[0][1]')."""
+    segs: List[str] = []
+    for k in keys:
+        if type(k) is int:
+            if not segs or segs[-1].endswith("]"):
+                return None
+            segs[-1] += f"[{k}]"
+        else:
+            segs.append(k)
+    return segs
+
+
+def bench_columns(path: str, repeat: int = 3) -> int:
+    """Throughput di lettura/scrittura dei campi di tutte le colonne: percorsi compilati contro
+    safe_get/safe_set, che rianalizzano il percorso a ogni chiamata."""
+    with open(path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    props = mapping_root(data).get("properties", {}) or {}
+    objs = [o for o in props.values() if isinstance(o, dict)]
+    fields: List[FieldPath] = []
+    segments: List[List[str]] = []
+    for c in COLUMNS:
+        seg = _safe_segments(c.field.keys) if c.field is not None else None
+        if seg is None:
+            if c.field is not None:
+                print(f"escluso '{c.header}': percorso non esprimibile con safe_get ({c.field.text})")
+            continue
+        fields.append(c.field)
+        segments.append(seg)
+    n = len(objs) * len(fields)
+    if not n:
+        print("nessuna property da misurare")
+        return 1
+
+    def best(fn) -> float:
+        times = []
+        for _ in range(repeat):
+            t0 = time.perf_counter()
+            fn()
+            times.append(time.perf_counter() - t0)
+        return min(times)
+
+    def get_parsed():
+        for o in objs:
+            for seg in segments:
+                safe_get(o, seg)
+
+    def get_compiled():
+        for o in objs:
+            for fp in fields:
+                fp.get(o)
+
+    def set_parsed():
+        for o in objs:
+            for seg in segments:
+                safe_set(o, seg, 1)
+
+    def set_compiled():
+        for o in objs:
+            for fp in fields:
+                fp.set(o, 1)
+
+    print(f"{len(objs)} property x {len(fields)} campi ({os.path.basename(path)})")
+    for label, parsed, compiled in (("lettura", get_parsed, get_compiled), ("scrittura", set_parsed, set_compiled)):
+        t_parsed, t_compiled = best(parsed), best(compiled)
+        print(f"{label:<10} safe_*: {n / t_parsed:>12,.0f}/s   compilati: {n / t_compiled:>12,.0f}/s"
+              f"   x{t_parsed / t_compiled:.1f}")
+    return 0
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=APP_TITLE)
+    parser.add_argument("--check", metavar="FILE",
+                        help="controlla duplicati/conflitti nel mapping ed esce (exit 1 se trovati)")
+    parser.add_argument("--columns", metavar="FILE",
+                        help=f"colonne aggiuntive (JSON); di default {COLUMNS_FILE} accanto allo script")
+    parser.add_argument("--bench", metavar="FILE",
+                        help="misura lettura/scrittura dei campi colonna (compilati vs safe_get/safe_set) ed esce")
+    args = parser.parse_args(argv)
+    if args.check:
+        return check_file(args.check)
+
+    try:
+        base = os.path.dirname(__file__)
+    except NameError:
+        base = os.getcwd()
+    columns_path = args.columns or os.path.join(base, COLUMNS_FILE)
+    columns_error = None
+    if args.columns or os.path.exists(columns_path):
+        try:
+            configure_columns(load_column_schema(columns_path))
+        except (OSError, ValueError) as e:
+            columns_error = f"Schema colonne non caricato ({columns_path}):\n{e}"
+            if args.bench:
+                print(columns_error, file=sys.stderr)
+                return 2
+
+    if args.bench:
+        return bench_columns(args.bench)
+
     root = tk.Tk()
     root.title(APP_TITLE)
     root.geometry("1300x720")
@@ -831,30 +2752,25 @@ def main():
     except Exception:
         pass
 
+    if columns_error:
+        messagebox.showwarning(APP_TITLE, columns_error)
+
     app = MappingEditor(root)
+    root.protocol("WM_DELETE_WINDOW", app.on_quit)
 
     # auto-load se il file è a fianco dello script
-    try:
-        base = os.path.dirname(__file__)
-    except NameError:
-        base = os.getcwd()
     default_path = os.path.join(base, "2500053_Mapping.json")
 
     if os.path.exists(default_path):
         try:
-            with open(default_path, "r", encoding="utf-8") as f:
-                app.data = json.load(f)
-            app.file_path = default_path
-            app.btn_save.config(state=tk.NORMAL)
-            app.btn_save_as.config(state=tk.NORMAL)
-            app.status.set(f"Caricato: {os.path.basename(default_path)}")
-            app._reindex()
+            app.open_document(default_path)
         except Exception as e:
             messagebox.showwarning(APP_TITLE, f"""Apertura iniziale fallita:
 {e}""")
 
     root.mainloop()
+    return 0
 
 
 if __name__ == "__main__":
-    main()
+    sys.exit(main())